@@ -2,6 +2,7 @@ from copy import deepcopy
 from typing import Callable, TypeVar, ParamSpec, Awaitable
 import functools
 from itertools import product
+from random import getrandbits
 import asyncio
 import concurrent.futures
 
@@ -50,6 +51,186 @@ pruning_counter = 0
 # This counts how many times the minimax hit the recursive depth limit:
 depth_limit_counter = 0
 
+####################################
+# TRANSPOSITION TABLE
+#
+# The same board position can be reached through different move orders
+# (X at A then B, or X at B then A). Without a table, the minimax searches
+# that position again every time. A transposition table remembers what the
+# search found for each position, so later visits can reuse the result.
+
+# Zobrist hashing: every (cell, player) pair gets a random 64 bit number.
+# The hash of a board is all the numbers of its pieces XOR'd together.
+# Because XOR undoes itself, placing OR removing a piece is a single XOR,
+# so the minimax can keep the hash up to date as it makes and undoes moves
+# instead of re-hashing the whole board at every node.
+zobrist_keys = [[(getrandbits(64), getrandbits(64)) for _ in range(grid_size)] for _ in range(grid_size)]
+board_hash = 0
+
+# Because of alpha-beta pruning, a stored score isn't always the exact score.
+# If the search stopped early because of beta, the real score is AT LEAST the
+# stored one (a lower bound). If no move beat alpha, the real score is AT MOST
+# the stored one (an upper bound). So every entry also records which it is:
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+class TranspositionTable:
+    """
+    Fixed-size table of searched positions, indexed by the board hash.
+
+    Its size is capped, so positions have to share slots. When two collide,
+    the entry from the deeper search is kept (it took more work to get),
+    unless the stored entry is left over from an earlier turn, which is
+    replaced first. The table itself is kept for the whole game, so
+    positions searched on one turn are reused on the next."""
+
+    def __init__(self, size_bits: int = 18):
+        self.mask = (1 << size_bits) - 1
+        # Each slot is (key, depth, score, bound, best_move, age) or None.
+        self.slots: list[tuple | None] = [None] * (1 << size_bits)
+        self.age = 0
+        self.hits = 0       # only for logging, like the counters above
+
+    def new_search(self):
+        self.age += 1
+        self.hits = 0
+
+    def probe(self, key: int) -> tuple | None:
+        entry = self.slots[key & self.mask]
+        # Two different boards can land in the same slot, so check the full key:
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: int, best_move: tuple[int, int] | None):
+        index = key & self.mask
+        old = self.slots[index]
+        if old is None or old[0] == key or old[5] != self.age or depth >= old[1]:
+            self.slots[index] = (key, depth, score, bound, best_move, self.age)
+
+transposition_table = TranspositionTable()
+
+####################################
+# INCREMENTAL WIN DETECTION
+#
+# Number every line a player can win on: the rows first, then the columns,
+# then the two diagonals. For each player we count how many of their pieces
+# are on each line. A player has won as soon as one of their counts reaches
+# grid_size, and placing a piece can only change the counts of the (at most
+# four) lines through that cell. So checking for a win after a move is a
+# handful of additions instead of a scan of the whole board.
+
+# The lines through each cell:
+cell_lines = [[[row, grid_size + col]
+               + ([2 * grid_size] if row == col else [])
+               + ([2 * grid_size + 1] if row + col == grid_size - 1 else [])
+               for col in range(grid_size)] for row in range(grid_size)]
+# line_counts[0] is player 1's pieces on each line, line_counts[1] player 2's:
+line_counts = [[0] * (2 * grid_size + 2), [0] * (2 * grid_size + 2)]
+# How many cells are taken. When it reaches grid_size * grid_size it's a draw.
+filled_cells = 0
+
+def setup_search(board: list[list[int]]):
+    """Work out the hash, line counts and filled cells of the board from scratch.
+    Only needed once per turn, the minimax keeps them updated from there."""
+    global board_hash, line_counts, filled_cells
+    board_hash = 0
+    line_counts = [[0] * (2 * grid_size + 2), [0] * (2 * grid_size + 2)]
+    filled_cells = 0
+    for row, col in product(range(grid_size), range(grid_size)):
+        player = board[row][col]
+        if player != 0:
+            board_hash ^= zobrist_keys[row][col][player - 1]
+            for line in cell_lines[row][col]:
+                line_counts[player - 1][line] += 1
+            filled_cells += 1
+
+def make_move(board: list[list[int]], row: int, col: int, player: int) -> bool:
+    """Place a piece, updating the hash and the counters. Returns True if the move wins."""
+    global board_hash, filled_cells
+    board[row][col] = player
+    board_hash ^= zobrist_keys[row][col][player - 1]
+    filled_cells += 1
+    won = False
+    for line in cell_lines[row][col]:
+        line_counts[player - 1][line] += 1
+        if line_counts[player - 1][line] == grid_size:
+            won = True
+    return won
+
+def undo_move(board: list[list[int]], row: int, col: int, player: int):
+    """Take back a move made with make_move. XOR-ing the same key again takes it
+    back out of the hash."""
+    global board_hash, filled_cells
+    board[row][col] = 0
+    board_hash ^= zobrist_keys[row][col][player - 1]
+    filled_cells -= 1
+    for line in cell_lines[row][col]:
+        line_counts[player - 1][line] -= 1
+
+####################################
+# MOVE ORDERING
+#
+# Alpha-beta pruning can only skip the rest of the moves at a node once it has
+# found a move that is good enough. If the best move happens to be tried first,
+# the pruner cuts off almost everything else. If it's tried last, it prunes
+# nothing. So instead of trying the cells in board order, order_moves below
+# sorts them so the moves most likely to be good come first. Each heuristic can
+# be switched off, to see how much it helps (compare minimax_counter):
+
+USE_TT_MOVE = True      # 1. the best move the transposition table remembers for this position
+USE_KILLERS = True      # 2. "killer moves": moves that caused a cutoff at the same depth before
+USE_HISTORY = True      # 3. the history table: moves that caused cutoffs anywhere in the tree
+USE_CENTRE = True       # 4. cells on more winning lines first (centre, then the corners on 3x3)
+
+# Killer moves: for each depth, the last two moves that caused a cutoff there.
+# Sibling positions (same depth, one move different) are often refuted by the
+# same move, so it's worth trying first.
+killer_moves: list[list[tuple[int, int] | None]] = [[None, None] for _ in range(grid_size * grid_size + 1)]
+# History table: for each player and cell, a score that goes up every time that
+# move causes a cutoff. Cutoffs higher up the tree prune more, so they add more
+# (remaining depth squared).
+history_table = [[[0] * grid_size for _ in range(grid_size)] for _ in range(2)]
+# The cells sorted by how many winning lines go through them, most first:
+centre_order = sorted(product(range(grid_size), range(grid_size)),
+                      key=lambda cell: -len(cell_lines[cell[0]][cell[1]]))
+
+# Only for logging, like the counters above. For every cutoff, which heuristic
+# had put that move where it was, and how often it was the very first move tried.
+# A high first-move share means the ordering is doing its job.
+ordering_stats = {"cutoffs": 0, "first_move": 0, "tt_move": 0, "killer": 0, "history": 0, "centre": 0, "board": 0}
+
+def order_moves(board: list[list[int]], depth: int, player: int,
+                tt_move: tuple[int, int] | None) -> list[tuple[tuple[int, int], str]]:
+    """Returns every empty cell, most promising first, each with the name of the
+    heuristic that placed it (for ordering_stats)."""
+    moves = []
+    taken = set()
+    if USE_TT_MOVE and tt_move is not None and tt_move != (-1, -1):
+        if board[tt_move[0]][tt_move[1]] == 0:
+            moves.append((tt_move, "tt_move"))
+            taken.add(tt_move)
+    if USE_KILLERS:
+        for killer in killer_moves[depth]:
+            if killer is not None and killer not in taken and board[killer[0]][killer[1]] == 0:
+                moves.append((killer, "killer"))
+                taken.add(killer)
+
+    cells = centre_order if USE_CENTRE else product(range(grid_size), range(grid_size))
+    rest = [cell for cell in cells if board[cell[0]][cell[1]] == 0 and cell not in taken]
+    if USE_HISTORY:
+        history = history_table[player - 1]
+        # sort() keeps the order of cells with the same score, so ties stay centre first:
+        rest.sort(key=lambda cell: history[cell[0]][cell[1]], reverse=True)
+    for row, col in rest:
+        if USE_HISTORY and history_table[player - 1][row][col] > 0:
+            moves.append(((row, col), "history"))
+        else:
+            moves.append(((row, col), "centre" if USE_CENTRE else "board"))
+    return moves
+
 async def computer_turn_orch():
 
     board_copy = deepcopy(int_board)
@@ -61,6 +242,7 @@ async def computer_turn_orch():
         f"Minimax counter: {minimax_counter}\n"
         f"Branches pruned: {pruning_counter}\n"
         f"Times depth limit reached: {depth_limit_counter}\n"
+        f"Move ordering: {ordering_stats}\n"
     )        
 
     int_board[ai_row][ai_col] = 2              # Apply AI move to integer board
@@ -88,6 +270,17 @@ async def computer_turn_orch():
 @run_in_thread_awaitable
 def computer_turn_worker(board: list[list[int]]) -> tuple[int, int]:
 
+    # Set up the hash and win counters once, the minimax keeps them updated from here:
+    setup_search(board)
+    transposition_table.new_search()
+    # Killer moves are stored by depth, and depth 0 is a different position every
+    # turn, so they start over. The history table is only halved: moves that were
+    # good last turn are probably still decent.
+    global killer_moves
+    killer_moves = [[None, None] for _ in killer_moves]
+    for player_history in history_table:
+        for history_row in player_history:
+            history_row[:] = [score // 2 for score in history_row]
     _, best_move = minimax(
         board,
         depth=0,
@@ -120,45 +313,13 @@ def minimax(
     global minimax_counter
     minimax_counter += 1
 
-    # Very first step: Run the calculate winner function on the integer board
-    # AS THE BOARD IS going into the function BEFORE trying out any moves.
-    # We want to see, is there *currently* a winning move on the board?
-    # Of course, this will never find a winning move at our starting depth of 0.
-    # Because that would mean the human player already won and the game is over.
-    # Thus, we know on the first depth-level minimax run, this is guaranteed
-    # to return -1 the first time, meaning 'no win found / game ongoing'.
-    result = calculate_winner(board)
-  
-    # Note the calculate winner function is not shown in this example script.
-    # It's not necessary to show it, in our case its just a basic tic tac toe
-    # winner checker. But the point is that its modular - this winner calculator
-    # can be changed to match whatever game this minimax algorithm is used in.
-
-    # this is just to assist the type checking in this example:
-    assert result in [-1, 0, 1, 2]
-
-    # If the minimax has found a winning move
-    if result == 2:                 # found winning move for player 2     
-        return 10 - depth, None
-    elif result == 1:               # found winning move for player 1
-        return -10 + depth, None
-    elif result == 0:               # This move results in a draw game
-        return 0, None
-    # EXPLANATION:
-    # If the result is PLAYER 2, that means the AI would win with that move.
-    # So we return a score of 10, minus the depth it took to find that win.
-    # (ie, one depth level would mean 10-1 which is a score of 9)
-    
-    # If result is PLAYER 1, that means the AI would lose with that move.
-    # So return a score of negative 10, plus the depth
-    # (ie one depth level would mean -10+4 depth away would give -6)
-    # This illustrates how the Human's winning move is less dangerous the more
-    # moves away it would be, and the computer's winning move is more useful
-    # the less moves away it would be.
-    # Also note that the "game ending" cases above return `None` for coordinate.
-    # We know they can't happen on depth 0, so we just want them to recurse back
-    # to the previous stack level and return the score. Then the loop below
-    # will record the move (row, col) which achieved that score.
+    # NOTE: There is no calculate_winner call here. Checking the whole board at
+    # every node means rebuilding every row, column and diagonal, which was the
+    # most expensive part of each node. Instead, the loop further down checks
+    # for a win right after it makes a move (see make_move), because only the
+    # lines through the cell just played can have been completed. So a position
+    # where the game is over never reaches this point: the move that ended the
+    # game is scored directly in the loop.
     
     # This section here is to adjust the depth limit based on some criteria. You
     # can for example continuously raise/lower the depth limit as the game progresses
@@ -189,6 +350,30 @@ def minimax(
         depth_limit_counter += 1
         return 0, None  # found nothing so return score of 0 (same as if it found a draw)
 
+    # Now check the transposition table before searching any moves.
+    # `remaining` is how many more moves deep we would search from here. A stored
+    # entry is only good enough if it searched at least that deep itself.
+    remaining = max_depth - depth
+    # Keep the alpha and beta we started with, to know later what kind of
+    # score (exact or a bound) we end up storing:
+    alpha_start, beta_start = alpha, beta
+    entry = transposition_table.probe(board_hash)
+    # We don't use the table at depth 0, because the root must search to pick a move.
+    if entry is not None and depth > 0 and entry[1] >= remaining:
+        _, _, stored, bound, stored_move, _ = entry
+        # Win and loss scores include the depth (10 - depth). They are stored as
+        # "10 - moves from this position", so convert back to our depth here:
+        score = stored - depth if stored > 0 else stored + depth if stored < 0 else 0
+        if bound == EXACT:
+            return score, stored_move
+        # A bound can still narrow our window, and maybe close it completely:
+        if bound == LOWER_BOUND:
+            alpha = max(alpha, score)
+        else:
+            beta = min(beta, score)
+        if beta <= alpha:
+            return score, stored_move
+
     player: int = 2 if maximizingPlayer else 1
     # var to hold current best move tuple:
     best_move: tuple[int, int]  = (-1, -1)
@@ -199,63 +384,94 @@ def minimax(
     # at negative inf because that is the worst possible score for the maximizer.
     # Vice versa for Player 1 (human, minimizer).
     
-    # Now try all possible moves.
-    # EXPLANATION:
-    # product() from itertools package is some pythonic syntax sugar
-    # that replaces nested for loops. This is equivalent to doing:
-    # for row in range(grid_size):
-    #     for col in range(grid_size):
-    
-    for row, col in product(range(grid_size), range(grid_size)):
-        if board[row][col] == 0:    # only empty cells (aka only valid moves)
+    # Now try all possible moves (aka all empty cells), in the order that
+    # order_moves thinks is best. See MOVE ORDERING above.
+    tt_move = entry[4] if entry is not None else None
+    for index, ((row, col), source) in enumerate(order_moves(board, depth, player, tt_move)):
 
-            # place player on board at this spot:
-            board[row][col] = player
+        # place player on board at this spot. make_move also updates the
+        # hash and the line counters, and tells us if this move won:
+        if make_move(board, row, col, player):
+            # If the AI (player 2) would win with this move, we score it
+            # 10, minus the depth of the finished board. (ie, winning on
+            # the first move would mean 10-1 which is a score of 9)
+            # If the human would win, score it negative 10 plus the depth
+            # (ie a win 4 moves away would give -10+4 = -6).
+            # This illustrates how the Human's winning move is less dangerous
+            # the more moves away it would be, and the computer's winning
+            # move is more useful the less moves away it would be.
+            score = 10 - (depth + 1) if maximizingPlayer else -10 + (depth + 1)
+        elif filled_cells == grid_size * grid_size:
+            # No win and no empty cells left: this move results in a draw game.
+            # Reading a counter is much cheaper than scanning the board for 0s.
+            score = 0
+        else:
             # Then run the minimaxer with the new board.
             # NOTE that the alpha and the beta might be changing with each loop!
             # Remember that the for loop checks EVERY available move at this
             # depth level, then updates the best score and alpha/betas.
             score, _, = minimax(board, depth + 1, not maximizingPlayer, alpha, beta)
-            # When finished, undo the move:
-            board[row][col] = 0
-            # EXPLANATION on move undo-ing:
-            # After finishing every recursive call, the board will be put back
-            # the way it was, recursively. This saves us from needing to
-            # create many hundreds or thousands of copies of the integer board.
-            # Its faster to undo moves than to deepcopy the entire board every
-            # time the minimax is called recursively (which might be hundreds
-            # of thousands of calls).
-
-            # Remember, if maximizing (AI, player 2), best_score starts
-            # at negative infinity
-            if maximizingPlayer:
-                if score > best_score:
-                    best_score = float(score)
-                    best_move = (row, col)
-                    # Pruner: set alpha at this depth to new score
-                    # if it's higher than previous alpha
-                    alpha = max(score, alpha)
-            # if minimizing (simulating human player), best_score starts
-            # at positive infinity
-            else:
-                if score < best_score:
-                    best_score = float(score)
-                    best_move = (row, col)
-                    # Pruner: set beta at this depth to new score
-                    # if its lower than previous beta
-                    beta = min(score, beta)
-                    
-            # Note the Pruner is not technically necessary for the minimaxer
-            # to work but it greatly enhance the speed and efficiency.
-
-            if beta <= alpha:
-                # The pruning counter here is only for logging:
-                global pruning_counter
-                pruning_counter += 1
+        # When finished, undo the move (this takes it out of the hash and counters too):
+        undo_move(board, row, col, player)
+        # EXPLANATION on move undo-ing:
+        # After finishing every recursive call, the board will be put back
+        # the way it was, recursively. This saves us from needing to
+        # create many hundreds or thousands of copies of the integer board.
+        # Its faster to undo moves than to deepcopy the entire board every
+        # time the minimax is called recursively (which might be hundreds
+        # of thousands of calls).
+
+        # Remember, if maximizing (AI, player 2), best_score starts
+        # at negative infinity
+        if maximizingPlayer:
+            if score > best_score:
+                best_score = float(score)
+                best_move = (row, col)
+                # Pruner: set alpha at this depth to new score
+                # if it's higher than previous alpha
+                alpha = max(score, alpha)
+        # if minimizing (simulating human player), best_score starts
+        # at positive infinity
+        else:
+            if score < best_score:
+                best_score = float(score)
+                best_move = (row, col)
+                # Pruner: set beta at this depth to new score
+                # if its lower than previous beta
+                beta = min(score, beta)
                 
-                # This break is the necessary part for the pruner to work.
-                # We are telling it to stop searching for more moves at this
-                # depth level and recurse out.
-                break
+        # Note the Pruner is not technically necessary for the minimaxer
+        # to work but it greatly enhance the speed and efficiency.
+
+        if beta <= alpha:
+            # The pruning counter here is only for logging:
+            global pruning_counter
+            pruning_counter += 1
+            ordering_stats["cutoffs"] += 1
+            ordering_stats["first_move"] += index == 0
+            ordering_stats[source] += 1
+
+            # This move was good enough to end the search here, so remember it
+            # for the move ordering: as a killer at this depth, and in the history.
+            if source != "tt_move" and killer_moves[depth][0] != (row, col):
+                killer_moves[depth] = [(row, col), killer_moves[depth][0]]
+            history_table[player - 1][row][col] += remaining * remaining
+            
+            # This break is the necessary part for the pruner to work.
+            # We are telling it to stop searching for more moves at this
+            # depth level and recurse out.
+            break
+
+    # Store what we found in the transposition table. If the best score never
+    # got above the alpha we started with, it's only an upper bound. If it
+    # reached beta, we stopped early, so it's only a lower bound.
+    if best_score <= alpha_start:
+        bound = UPPER_BOUND
+    elif best_score >= beta_start:
+        bound = LOWER_BOUND
+    else:
+        bound = EXACT
+    stored = best_score + depth if best_score > 0 else best_score - depth if best_score < 0 else 0
+    transposition_table.store(board_hash, remaining, stored, bound, best_move)
 
     return best_score, best_move
\ No newline at end of file
@@ -4,114 +4,2023 @@ Author: Paul Robello
 Email: probello@gmail.com
 """
 
+import json
+import logging
+import mmap
 import random
+import re
+import struct
+import sys
+from collections import deque
 from enum import Enum
-from time import sleep
-from typing import List
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from operator import add
+from threading import Event, Lock, Thread
+from time import perf_counter, sleep
+from typing import Deque, Dict, Iterator, List, Optional, Set, Tuple
 
 import typer
 from rich.console import Console
+from rich.control import Control, ControlType
 from rich.live import Live
+from rich.segment import Segment, Segments
+from rich.style import Style
 from rich.table import Table
 from rich.text import Text
 from rich import print as rprint
 
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+try:
+    import numpy as np
+except ImportError:     # numpy is only required by the array backend
+    np = None
+
 
 app = typer.Typer()
 
-class NeighborhoodRules(str, Enum):
+class NeighborhoodRules(str, Enum):
+    """
+    Enum class representing the neighborhood rules for the Game of Life simulation.
+    """
+    MOORE = "moore"
+    VAN_NEUMANN = "van_neumann"
+
+class Backend(str, Enum):
+    """
+    Enum class representing how the grid is stored and stepped.
+    LOOP uses nested Python lists and a per-cell loop, NUMPY uses a 2D array
+    and counts neighbors with whole-array shifted sums, BITPACKED stores one
+    bit per cell and steps whole rows at once with bitwise adder logic,
+    HASHLIFE keeps a memoized quadtree that can jump ahead by powers of two,
+    SPARSE only evaluates cells around the ones that changed last generation.
+    """
+    LOOP = "loop"
+    NUMPY = "numpy"
+    BITPACKED = "bitpacked"
+    HASHLIFE = "hashlife"
+    SPARSE = "sparse"
+
+class View(str, Enum):
+    """
+    Enum class representing how `run` draws the board.
+    TABLE draws a rich Table with one cell per square, HALFBLOCK packs two rows
+    into each line of text and only redraws the lines that changed.
+    """
+    TABLE = "table"
+    HALFBLOCK = "halfblock"
+
+class CycleAction(str, Enum):
+    """
+    Enum class representing what `run` does about repeated boards.
+    OFF skips the state hashing, REPORT shows the cycle in the title, STOP
+    ends the run once a cycle is found and FAST_FORWARD skips whole periods
+    of the cycle towards the last generation.
+    """
+    OFF = "off"
+    REPORT = "report"
+    STOP = "stop"
+    FAST_FORWARD = "fast_forward"
+
+class Profile(str, Enum):
+    """
+    Enum class representing where per-phase timings of a run are reported.
+    OFF disables them, LOG writes a line per frame to the logging module,
+    JSONL appends a JSON object per frame to a file and OVERLAY shows the
+    last frame's timings under the title.
+    """
+    OFF = "off"
+    LOG = "log"
+    JSONL = "jsonl"
+    OVERLAY = "overlay"
+
+class StartPattern(str, Enum):
+    """
+    Enum class representing what the board starts with.
+    RANDOM fills it with seeded noise, the others place a built-in pattern
+    in the middle of an empty board.
+    """
+    RANDOM = "random"
+    GLIDER_GUN = "glider-gun"
+    R_PENTOMINO = "r-pentomino"
+
+MASK64: int = (1 << 64) - 1
+
+def cell_key(index: int) -> int:
+    """
+    Get the 64-bit Zobrist key of a cell, by mixing its flat index with
+    splitmix64 (so no per-cell key table needs to be stored).
+    Args:
+        index (int): Flat cell index, y * width + x.
+    Returns:
+        int: The cell's key.
+    """
+    z = (index + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+def xor_cell_keys_array(indices: "np.ndarray") -> int:
+    """
+    XOR together the keys of many cells at once, same keys as cell_key.
+    Args:
+        indices (np.ndarray): Flat cell indices.
+    Returns:
+        int: XOR of their keys.
+    """
+    if indices.size == 0:
+        return 0
+    z = indices.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)     # uint64 arrays wrap on overflow
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return int(np.bitwise_xor.reduce(z ^ (z >> np.uint64(31))))
+
+def neighbor_offsets(rules: NeighborhoodRules, radius: int = 1) -> List[Tuple[int, int]]:
+    """
+    Get the (dx, dy) offsets of the neighbors of a cell.
+    Args:
+        rules (NeighborhoodRules): Neighborhood rules to use.
+        radius (int): Range of the neighborhood. Defaults to 1.
+    Returns:
+        List[Tuple[int, int]]: Offsets of every neighbor, excluding the cell itself.
+    """
+    span = range(-radius, radius + 1)
+    if rules == NeighborhoodRules.VAN_NEUMANN:
+        return [(dx, dy) for dx in span for dy in span if (dx or dy) and abs(dx) + abs(dy) <= radius]
+    return [(dx, dy) for dx in span for dy in span if dx or dy]
+
+# Common rules that can be given by name instead of a rulestring.
+RULE_ALIASES: Dict[str, str] = {
+    "life": "B3/S23",
+    "highlife": "B36/S23",
+    "seeds": "B2/S",
+    "daynight": "B3678/S34678",
+    "bosco": "R5,C0,M1,S34..58,B34..45,NM",
+}
+
+class LifeRule:
+    """
+    An outer-totalistic rule (birth and survival counts) compiled into a lookup table.
+
+    `table[state][count]` is the next state of a cell in `state` with `count`
+    live neighbors, and `offsets` is the neighborhood kernel. Both are fixed
+    at construction, so stepping a cell never has to branch on the rule.
+    """
+
+    def __init__(
+        self,
+        birth: Set[int],
+        survival: Set[int],
+        neighborhood: NeighborhoodRules = NeighborhoodRules.MOORE,
+        radius: int = 1,
+        middle: bool = False,
+        name: str = "",
+    ) -> None:
+        """
+        Args:
+            birth (Set[int]): Neighbor counts that bring a dead cell to life.
+            survival (Set[int]): Neighbor counts that keep a live cell alive.
+            neighborhood (NeighborhoodRules): Shape of the neighborhood.
+            radius (int): Range of the neighborhood. Defaults to 1.
+            middle (bool): Whether the counts include the cell itself (Larger than Life M1).
+            name (str): Rulestring used for display.
+        """
+        self.birth: Set[int] = set(birth)
+        self.survival: Set[int] = set(survival)
+        self.neighborhood: NeighborhoodRules = neighborhood
+        self.radius: int = radius
+        self.middle: bool = middle
+        self.offsets: List[Tuple[int, int]] = neighbor_offsets(neighborhood, radius)
+        self.max_count: int = len(self.offsets)
+        self.name: str = name or f"B{''.join(map(str, sorted(birth)))}/S{''.join(map(str, sorted(survival)))}"
+        # With M1 a live cell counts itself, so its neighbor count is shifted by one.
+        self.table: List[List[int]] = [
+            [1 if count in self.birth else 0 for count in range(self.max_count + 1)],
+            [1 if count + middle in self.survival else 0 for count in range(self.max_count + 1)],
+        ]
+        self.lookup = np.array(self.table, dtype=np.uint8) if np is not None else None
+
+    @classmethod
+    def parse(cls, rulestring: str, neighborhood: NeighborhoodRules = NeighborhoodRules.MOORE) -> "LifeRule":
+        """
+        Parse a rulestring.
+        Accepts B/S notation ("B36/S23", "B2/S", "B2/S2V" for von Neumann), the older S/B notation ("23/3"),
+        Larger than Life rules in Golly's format ("R5,C0,M1,S34..58,B34..45,NM")
+        and the names in RULE_ALIASES.
+        Args:
+            rulestring (str): The rule to parse.
+            neighborhood (NeighborhoodRules): Neighborhood for B/S rules. Larger
+                than Life rules name their own (NM or NN).
+        Returns:
+            LifeRule: The compiled rule.
+        Raises:
+            ValueError: If the rulestring can't be parsed or isn't supported.
+        """
+        text = RULE_ALIASES.get(rulestring.strip().lower(), rulestring.strip())
+
+        match = re.fullmatch(r"[Bb](\d*)/?[Ss](\d*)([Vv]?)", text)
+        if match:
+            if match[3]:    # Golly's suffix for the von Neumann neighborhood
+                neighborhood = NeighborhoodRules.VAN_NEUMANN
+            return cls({int(d) for d in match[1]}, {int(d) for d in match[2]}, neighborhood,
+                       name=f"B{match[1]}/S{match[2]}")
+        match = re.fullmatch(r"(\d*)/(\d*)", text)
+        if match:
+            return cls({int(d) for d in match[2]}, {int(d) for d in match[1]}, neighborhood, name=text)
+        if text.upper().startswith("R"):
+            return cls._parse_larger_than_life(text)
+        raise ValueError(f"Unrecognised rulestring: {rulestring!r}")
+
+    @classmethod
+    def _parse_larger_than_life(cls, text: str) -> "LifeRule":
+        fields: Dict[str, str] = {}
+        for field in text.upper().split(","):
+            if not field:
+                continue
+            fields[field[0]] = field[1:]
+
+        def count_range(value: str) -> Set[int]:
+            low, _, high = value.partition("..")
+            return set(range(int(low), int(high or low) + 1))
+
+        try:
+            radius = int(fields.get("R", "1"))
+            states = int(fields.get("C", "0"))
+            middle = fields.get("M", "0") == "1"
+            survival = count_range(fields["S"]) if fields.get("S") else set()
+            birth = count_range(fields["B"]) if fields.get("B") else set()
+        except ValueError as error:
+            raise ValueError(f"Unrecognised Larger than Life rule: {text!r}") from error
+        if states not in (0, 2):
+            raise ValueError(f"Only two-state rules are supported, got C{states}.")
+        shapes = {"M": NeighborhoodRules.MOORE, "N": NeighborhoodRules.VAN_NEUMANN}
+        shape = fields.get("N", "M")
+        if shape not in shapes or radius < 1:
+            raise ValueError(f"Unsupported Larger than Life neighborhood: {text!r}")
+        return cls(birth, survival, shapes[shape], radius=radius, middle=middle, name=text.upper())
+
+
+class PackedGrid:
+    """
+    A grid that stores each row as a single Python int with one bit per cell.
+    Bit x of a row holds the cell in column x.
+
+    Indexing or iterating unpacks rows into lists of 0/1, so a PackedGrid can be
+    used anywhere a List[List[int]] grid is read (rendering, get_neighbors).
+    """
+
+    def __init__(self, width: int, rows: List[int]) -> None:
+        """
+        Args:
+            width (int): Number of cells (bits) in each row.
+            rows (List[int]): One packed int per row.
+        """
+        self.width: int = width
+        self.rows: List[int] = rows
+
+    @classmethod
+    def from_grid(cls, grid: List[List[int]]) -> "PackedGrid":
+        """
+        Pack a list-of-lists grid.
+        Args:
+            grid (List[List[int]]): Grid of 0/1 cells.
+        Returns:
+            PackedGrid: The packed grid.
+        """
+        width = len(grid[0]) if grid else 0
+        return cls(width, [cls.pack_row(row) for row in grid])
+
+    @staticmethod
+    def pack_row(row: List[int]) -> int:
+        """
+        Pack a row of 0/1 cells into an int, column 0 being the lowest bit.
+        """
+        return int("".join("1" if cell else "0" for cell in reversed(row)) or "0", 2)
+
+    def unpack_row(self, row: int) -> List[int]:
+        """
+        Unpack a packed row into a list of 0/1 cells.
+        """
+        return [int(bit) for bit in reversed(format(row, f"0{self.width}b"))]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, y: int) -> List[int]:
+        return self.unpack_row(self.rows[y])
+
+    def __iter__(self):
+        for row in self.rows:
+            yield self.unpack_row(row)
+
+def count_neighbors_array(grid: "np.ndarray", rule: LifeRule) -> "np.ndarray":
+    """
+    Count the live neighbors of every cell at once by summing shifted copies
+    of the grid. np.roll wraps around the edges, so this matches the modulo
+    wrapping done by GameOfLife.get_neighbors.
+    Only the last two axes are rolled, so a (batch, height, width) stack of
+    boards is counted in one go, each board wrapping on its own.
+    Args:
+        grid (np.ndarray): 2D array of 0/1 cells, or a stack of them.
+        rule (LifeRule): Rule whose neighborhood is counted.
+    Returns:
+        np.ndarray: Array of neighbor counts with the same shape as the grid.
+    """
+    if rule.max_count > 255:
+        grid = grid.astype(np.uint16)
+    if rule.neighborhood == NeighborhoodRules.VAN_NEUMANN:
+        return sum(np.roll(grid, (dy, dx), axis=(-2, -1)) for dx, dy in rule.offsets)
+    # A Moore neighborhood is a box, so sum each column first and then add the
+    # columns either side, which takes 4r shifts instead of (2r+1)^2 - 1.
+    # The cell itself is then removed.
+    span = range(1, rule.radius + 1)
+    vertical = grid + sum(np.roll(grid, dy, axis=-2) + np.roll(grid, -dy, axis=-2) for dy in span)
+    return vertical + sum(np.roll(vertical, dx, axis=-1) + np.roll(vertical, -dx, axis=-1) for dx in span) - grid
+
+def count_neighbors_lists(grid: List[List[int]], rule: LifeRule) -> List[List[int]]:
+    """
+    Count the live neighbors of every cell of a nested-list grid. Each
+    neighbor offset adds a rotated copy of the rows to the running counts,
+    so the inner loop runs in `map` rather than once per cell and offset.
+    Args:
+        grid (List[List[int]]): Rows of 0/1 cells (or anything iterable as such).
+        rule (LifeRule): Rule whose neighborhood is counted.
+    Returns:
+        List[List[int]]: Neighbor counts with the same shape as the grid.
+    """
+    rows: List[List[int]] = [list(row) for row in grid]
+    height: int = len(rows)
+    width: int = len(rows[0])
+    counts: List[List[int]] = [[0] * width for _ in range(height)]
+    for dx, dy in rule.offsets:
+        shift = dx % width
+        for y in range(height):
+            row = rows[(y + dy) % height]
+            counts[y] = list(map(add, counts[y], row[shift:] + row[:shift]))
+    return counts
+
+def step_array(grid: "np.ndarray", rule: LifeRule) -> "np.ndarray":
+    """
+    Compute the next generation of a numpy grid, or of a stack of grids.
+    Args:
+        grid (np.ndarray): 2D array of 0/1 cells, or a (batch, height, width) stack of them.
+        rule (LifeRule): Rule to apply.
+    Returns:
+        np.ndarray: The next generation as a new uint8 array.
+    """
+    return rule.lookup[grid, count_neighbors_array(grid, rule)]
+
+# Per-process state of the tile workers, set up by _init_tile_worker.
+_tile_worker: dict = {}
+
+def _init_tile_worker(names: List[str], shape: Tuple[int, int], rule: LifeRule) -> None:
+    """
+    Pool initializer: attach to the shared front/back grid buffers.
+    """
+    blocks = [SharedMemory(name=name, track=False) for name in names]
+    _tile_worker["blocks"] = blocks     # keep the mappings alive
+    _tile_worker["buffers"] = [np.ndarray(shape, dtype=np.uint8, buffer=block.buf) for block in blocks]
+    _tile_worker["rule"] = rule
+
+def _step_tile(front: int, y0: int, y1: int) -> None:
+    """
+    Step rows y0..y1 of the front buffer into the back buffer.
+    The tile is read together with a halo of `radius` rows above and below
+    (wrapping around the torus), stepped, and the halo rows are dropped again.
+    """
+    source, target = _tile_worker["buffers"][front], _tile_worker["buffers"][1 - front]
+    rule: LifeRule = _tile_worker["rule"]
+    rows = np.arange(y0 - rule.radius, y1 + rule.radius) % source.shape[0]
+    target[y0:y1] = step_array(source[rows], rule)[rule.radius:-rule.radius]
+
+class TiledStepper:
+    """
+    Steps a numpy grid in parallel on a process pool.
+
+    The grid lives in two shared-memory buffers (front and back) so no cells
+    are pickled between generations. The torus is split into full-width
+    horizontal tiles, one per worker. Each worker reads its tile plus the
+    neighboring halo rows (as many as the rule's radius) straight from the
+    front buffer and writes its result into the back buffer, then the
+    buffers swap. Every tile runs the same neighbor count and rule lookup as
+    the serial path, so the results are bit-identical.
+    """
+
+    def __init__(self, grid: "np.ndarray", rule: LifeRule, workers: int) -> None:
+        """
+        Args:
+            grid (np.ndarray): Starting grid.
+            rule (LifeRule): Rule to apply.
+            workers (int): Number of worker processes.
+        """
+        height: int = grid.shape[0]
+        self._blocks: List[SharedMemory] = [SharedMemory(create=True, size=max(grid.nbytes, 1)) for _ in range(2)]
+        self.buffers: List["np.ndarray"] = [np.ndarray(grid.shape, dtype=np.uint8, buffer=block.buf)
+                                            for block in self._blocks]
+        self.buffers[0][:] = grid
+        self.front: int = 0
+        bounds = [height * i // workers for i in range(workers + 1)]
+        self.tiles: List[Tuple[int, int]] = [(y0, y1) for y0, y1 in zip(bounds, bounds[1:]) if y1 > y0]
+        self._pool = Pool(
+            processes=workers,
+            initializer=_init_tile_worker,
+            initargs=([block.name for block in self._blocks], grid.shape, rule),
+        )
+
+    @property
+    def grid(self) -> "np.ndarray":
+        """
+        The current generation (a view of the front buffer).
+        """
+        return self.buffers[self.front]
+
+    def step(self) -> None:
+        """
+        Advance the shared grid by one generation.
+        """
+        self._pool.starmap(_step_tile, [(self.front, y0, y1) for y0, y1 in self.tiles])
+        self.front = 1 - self.front
+
+    def close(self) -> None:
+        """
+        Shut down the pool and release the shared memory. Views of the buffers
+        (such as grid) must not be used afterwards; closing twice is harmless.
+        """
+        if not self._blocks:
+            return
+        self._pool.close()
+        self._pool.join()
+        self.buffers = []
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+
+class HashLifeNode:
+    """
+    A square block of cells in a HashLife quadtree.
+    A level 0 node is a single cell, a level n node is 2**n cells wide and is
+    made of four level n-1 children. Nodes are immutable and canonical (see
+    HashLife.join), so two identical blocks are always the same object.
+    """
+    __slots__ = ("level", "nw", "ne", "sw", "se", "population")
+
+    def __init__(self, level: int, nw, ne, sw, se, population: int) -> None:
+        self.level: int = level
+        self.nw: HashLifeNode | None = nw
+        self.ne: HashLifeNode | None = ne
+        self.sw: HashLifeNode | None = sw
+        self.se: HashLifeNode | None = se
+        self.population: int = population
+
+class HashLife:
+    """
+    Memoized quadtree (HashLife) engine for a toroidal board.
+
+    The torus is treated as an infinite plane tiled with copies of the board,
+    which evolves exactly like the torus does. Because the tiling is periodic,
+    a big enough block of it can be advanced 2**j generations in one memoized
+    call for any j, so the state at generation 10**6 takes about 20 jumps.
+
+    Both sides of the board must be powers of two so the tiling lines up with
+    the quadtree, and the rule must have a radius of 1. The canonical-node
+    table is capped at max_nodes: when it grows past that the caches are
+    flushed, and after every jump only the nodes reachable from the current
+    board are kept.
+    """
+
+    def __init__(self, grid: List[List[int]], rule: LifeRule, max_nodes: int = 1_000_000) -> None:
+        """
+        Args:
+            grid (List[List[int]]): Starting board.
+            rule (LifeRule): Rule to apply.
+            max_nodes (int): Size cap for the canonical-node table.
+        """
+        self.height: int = len(grid)
+        self.width: int = len(grid[0])
+        for side in (self.width, self.height):
+            if side & (side - 1):
+                raise ValueError(f"HashLife needs power-of-two board sides, got {self.width}x{self.height}.")
+        if rule.radius != 1:
+            raise ValueError("HashLife only supports rules with a radius of 1.")
+        self.rule: LifeRule = rule
+        self.max_nodes: int = max_nodes
+        self.size: int = max(self.width, self.height)
+        self.level: int = self.size.bit_length() - 1
+
+        self._nodes: Dict[Tuple[HashLifeNode, ...], HashLifeNode] = {}
+        self._results: Dict[Tuple[HashLifeNode, int], HashLifeNode] = {}
+        self.dead: HashLifeNode = HashLifeNode(0, None, None, None, None, 0)
+        self.alive: HashLifeNode = HashLifeNode(0, None, None, None, None, 1)
+        self._empty: List[HashLifeNode] = [self.dead]
+        # With B0 empty space comes to life, so empty nodes can't be skipped.
+        self._skip_empty: bool = 0 not in rule.birth
+        self.root: HashLifeNode = self.from_grid(grid)
+
+    def join(self, nw: HashLifeNode, ne: HashLifeNode, sw: HashLifeNode, se: HashLifeNode) -> HashLifeNode:
+        """
+        Return the canonical node made of four children of the same level.
+        """
+        key = (nw, ne, sw, se)
+        node = self._nodes.get(key)
+        if node is None:
+            node = HashLifeNode(nw.level + 1, nw, ne, sw, se,
+                                nw.population + ne.population + sw.population + se.population)
+            self._nodes[key] = node
+        return node
+
+    def empty(self, level: int) -> HashLifeNode:
+        """
+        Return an all-dead node of the given level.
+        """
+        while len(self._empty) <= level:
+            child = self._empty[-1]
+            self._empty.append(self.join(child, child, child, child))
+        return self._empty[level]
+
+    def from_grid(self, grid: List[List[int]]) -> HashLifeNode:
+        """
+        Build the quadtree for a board, tiling it up to a square if needed.
+        """
+        layer = [[self.alive if grid[y % self.height][x % self.width] else self.dead
+                  for x in range(self.size)] for y in range(self.size)]
+        while len(layer) > 1:
+            layer = [[self.join(layer[y][x], layer[y][x + 1], layer[y + 1][x], layer[y + 1][x + 1])
+                      for x in range(0, len(layer), 2)] for y in range(0, len(layer), 2)]
+        return layer[0][0]
+
+    def to_grid(self) -> List[List[int]]:
+        """
+        Expand the current board into a list-of-lists grid.
+        """
+        grid: List[List[int]] = [[0] * self.width for _ in range(self.height)]
+
+        def fill(node: HashLifeNode, x: int, y: int) -> None:
+            if node.population == 0 or x >= self.width or y >= self.height:
+                return
+            if node.level == 0:
+                grid[y][x] = 1
+                return
+            half = 1 << (node.level - 1)
+            fill(node.nw, x, y)
+            fill(node.ne, x + half, y)
+            fill(node.sw, x, y + half)
+            fill(node.se, x + half, y + half)
+
+        fill(self.root, 0, 0)
+        return grid
+
+    def advance(self, generations: int) -> List[List[int]]:
+        """
+        Advance the board by a number of generations, one power-of-two jump
+        per set bit of the count.
+        Args:
+            generations (int): Number of generations to advance.
+        Returns:
+            List[List[int]]: The new board.
+        """
+        while generations:
+            j = generations.bit_length() - 1
+            self.root = self.jump(j)
+            generations -= 1 << j
+            if len(self._nodes) > self.max_nodes // 2:
+                self.collect()
+        return self.to_grid()
+
+    def period(self, repeat: int) -> int:
+        """
+        Find the shortest period of the current board, given that it comes back
+        after `repeat` generations. The period divides `repeat`, so each prime
+        factor is dropped in turn if the board still comes back without it,
+        which costs one jump per factor. The board is left as it was.
+        Args:
+            repeat (int): Generations after which the board is known to repeat.
+        Returns:
+            int: The smallest number of generations after which it repeats.
+        """
+        start: HashLifeNode = self.root
+        grid: List[List[int]] = self.to_grid()
+        period: int = repeat
+        remaining: int = repeat
+        factor: int = 2
+        while remaining > 1:
+            if factor * factor > remaining:
+                factor = remaining          # what is left is prime
+            if remaining % factor:
+                factor += 1
+                continue
+            remaining //= factor
+            self.root = start
+            if self.advance(period // factor) == grid:
+                period //= factor
+        self.root = start
+        return period
+
+    def jump(self, j: int) -> HashLifeNode:
+        """
+        Return the board advanced by 2**j generations.
+        """
+        # The block must be at least 4 boards wide so that its centre lines up
+        # with the tiling, and at least 2**(j + 2) wide to advance 2**j.
+        node = self.root
+        while node.level < max(self.level, j) + 2:
+            node = self.join(node, node, node, node)
+        result = self.successor(node, j)
+        while result.level > self.level:
+            result = result.nw
+        return result
+
+    def successor(self, node: HashLifeNode, j: int) -> HashLifeNode:
+        """
+        Return the centre of a level n node advanced by 2**j generations,
+        as a level n-1 node. j must be at most n-2.
+        """
+        if node.population == 0 and self._skip_empty:
+            return self.empty(node.level - 1)
+        if len(self._nodes) > self.max_nodes:
+            # Flushing mid-jump keeps memory capped, nodes already on the
+            # stack stay valid and only lose their memoized results.
+            self._nodes.clear()
+            self._results.clear()
+        key = (node, j)
+        result = self._results.get(key)
+        if result is not None:
+            return result
+
+        if node.level == 2:
+            result = self._step_4x4(node)
+        else:
+            nw, ne, sw, se = node.nw, node.ne, node.sw, node.se
+            join = self.join
+            # The nine overlapping level n-1 blocks.
+            blocks = (
+                nw, join(nw.ne, ne.nw, nw.se, ne.sw), ne,
+                join(nw.sw, nw.se, sw.nw, sw.ne), join(nw.se, ne.sw, sw.ne, se.nw), join(ne.sw, ne.se, se.nw, se.ne),
+                sw, join(sw.ne, se.nw, sw.se, se.sw), se,
+            )
+            if j == node.level - 2:
+                # Full speed: both stages advance 2**(j-1) generations.
+                r = [self.successor(block, j - 1) for block in blocks]
+                step = j - 1
+            else:
+                # Slower jump: the first stage only takes the centres.
+                r = [self._centre(block) for block in blocks]
+                step = j
+            result = join(
+                self.successor(join(r[0], r[1], r[3], r[4]), step),
+                self.successor(join(r[1], r[2], r[4], r[5]), step),
+                self.successor(join(r[3], r[4], r[6], r[7]), step),
+                self.successor(join(r[4], r[5], r[7], r[8]), step),
+            )
+
+        self._results[key] = result
+        return result
+
+    def _centre(self, node: HashLifeNode) -> HashLifeNode:
+        return self.join(node.nw.se, node.ne.sw, node.sw.ne, node.se.nw)
+
+    def _step_4x4(self, node: HashLifeNode) -> HashLifeNode:
+        """
+        Base case: advance the centre 2x2 of a 4x4 node by one generation.
+        """
+        cells = [
+            [node.nw.nw.population, node.nw.ne.population, node.ne.nw.population, node.ne.ne.population],
+            [node.nw.sw.population, node.nw.se.population, node.ne.sw.population, node.ne.se.population],
+            [node.sw.nw.population, node.sw.ne.population, node.se.nw.population, node.se.ne.population],
+            [node.sw.sw.population, node.sw.se.population, node.se.sw.population, node.se.se.population],
+        ]
+        table = self.rule.table
+        centre = []
+        for y in (1, 2):
+            for x in (1, 2):
+                neighbors = sum(cells[y + dy][x + dx] for dx, dy in self.rule.offsets)
+                centre.append(self.alive if table[cells[y][x]][neighbors] else self.dead)
+        return self.join(*centre)
+
+    def collect(self) -> None:
+        """
+        Garbage-collect the caches, keeping only nodes reachable from the
+        current board.
+        """
+        self._results.clear()
+        nodes: Dict[Tuple[HashLifeNode, ...], HashLifeNode] = {}
+        stack = [self.root] + self._empty[1:]
+        while stack:
+            node = stack.pop()
+            if node.level == 0:
+                continue
+            key = (node.nw, node.ne, node.sw, node.se)
+            if key not in nodes:
+                nodes[key] = node
+                stack.extend(key)
+        self._nodes = nodes
+
+class HalfBlockRenderer:
+    """
+    Draws the board straight to the terminal, two grid rows per line of text
+    using half-block glyphs, and only rewrites the lines that changed since
+    the previous frame.
+
+    Use it as a context manager: entering clears the screen and hides the
+    cursor, exiting moves the cursor below the board and shows it again.
+    """
+
+    # Index is top cell + 2 * bottom cell.
+    GLYPHS: str = " ▀▄█"
+
+    def __init__(self, console: Console, style: str = "bold green") -> None:
+        """
+        Args:
+            console (Console): Console to draw on.
+            style (str): Style of the live cells.
+        """
+        self.console: Console = console
+        self.style: str = style
+        self._glyph_table: Dict[int, str] = {code: glyph for code, glyph in enumerate(self.GLYPHS)}
+        self._previous: List[bytes] = []                # cell codes of each line last frame
+        self._segments: Dict[bytes, Segment] = {}       # reused between frames for repeated lines
+        self._title_lines: int = 1                      # the board starts on the line below the title
+        self.lines_redrawn: int = 0
+
+    def __enter__(self) -> "HalfBlockRenderer":
+        self.console.clear()
+        self.console.show_cursor(False)
+        self._previous = []
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.console.control(Control.move_to(0, len(self._previous) + self._title_lines))
+        self.console.show_cursor(True)
+
+    def _segment(self, codes: bytes) -> Segment:
+        segment = self._segments.get(codes)
+        if segment is None:
+            if len(self._segments) > 4096:
+                self._segments.clear()
+            text = codes.decode("latin-1").translate(self._glyph_table)[:self.console.width]
+            segment = self._segments[codes] = Segment(text, Style.parse(self.style))
+        return segment
+
+    def draw(self, grid: List[List[int]], title: Text) -> None:
+        """
+        Draw one frame.
+        Args:
+            grid (List[List[int]]): Rows of 0/1 cells (any grid backend).
+            title (Text): Title printed above the board. It may span several lines
+                (the timings overlay adds one); the board is drawn below all of them.
+        """
+        rows = list(grid)
+        blank = [0] * (len(rows[0]) if rows else 0)
+        title_lines = title.split("\n")
+        if len(title_lines) != self._title_lines:
+            # The board moved up or down, so every line of it has to be redrawn
+            self.console.clear()
+            self._title_lines = len(title_lines)
+            self._previous = []
+        for row, text in enumerate(title_lines):
+            self.console.control(Control.move_to(0, row))
+            self.console.print(text, end="", no_wrap=True, crop=True, overflow="crop")
+            self.console.control(Control((ControlType.ERASE_IN_LINE, 0)))     # clear the rest of the old title
+
+        self.lines_redrawn = 0
+        for line, y in enumerate(range(0, len(rows), 2)):
+            bottom = rows[y + 1] if y + 1 < len(rows) else blank
+            codes = bytes(top + 2 * low for top, low in zip(rows[y], bottom))
+            if line < len(self._previous) and self._previous[line] == codes:
+                continue
+            if line < len(self._previous):
+                self._previous[line] = codes
+            else:
+                self._previous.append(codes)
+            self.console.control(Control.move_to(0, line + self._title_lines))
+            self.console.print(Segments([self._segment(codes)]), end="")
+            self.lines_redrawn += 1
+
+class FrameRing:
+    """
+    Bounded ring buffer of (generation, grid snapshot) frames, filled by a
+    simulation thread and sampled by the display. When it is full the oldest
+    frame is dropped, so the simulation never waits for the display.
+    """
+
+    def __init__(self, size: int) -> None:
+        """
+        Args:
+            size (int): Maximum number of frames kept.
+        """
+        self._frames: Deque[Tuple[int, List[List[int]]]] = deque(maxlen=size)
+        self._lock: Lock = Lock()
+        self.produced: int = 0
+
+    def push(self, generation: int, grid: List[List[int]]) -> None:
+        """
+        Add a frame, dropping the oldest one if the buffer is full.
+        """
+        with self._lock:
+            self._frames.append((generation, grid))
+            self.produced += 1
+
+    def latest(self) -> Optional[Tuple[int, List[List[int]]]]:
+        """
+        Get the newest frame, or None if nothing has been pushed yet.
+        """
+        with self._lock:
+            return self._frames[-1] if self._frames else None
+
+
+class _Phase:
+    """
+    Reusable context manager that adds the time spent inside it to one phase
+    of a Timings. One instance per phase name, so timing allocates nothing.
+    """
+    __slots__ = ("timings", "name", "start")
+
+    def __init__(self, timings: "Timings", name: str) -> None:
+        self.timings = timings
+        self.name = name
+        self.start: float = 0.0
+
+    def __enter__(self) -> "_Phase":
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        elapsed = perf_counter() - self.start
+        with self.timings.lock:
+            frame = self.timings.frame
+            frame[self.name] = frame.get(self.name, 0.0) + elapsed
+
+class _NoPhase:
+    """
+    Context manager that does nothing, handed out when timing is disabled.
+    """
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoPhase":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        return None
+
+class TimingSink:
+    """
+    Receives one record per frame from Timings. Subclasses override `emit`,
+    and `overlay` if they have something to show on screen.
+    """
+
+    def emit(self, record: dict) -> None:
+        """
+        Handle the record of one frame.
+        Args:
+            record (dict): Generation, phase times in milliseconds and counters.
+        """
+
+    def overlay(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Text to show under the title, if any.
+        """
+        return None
+
+    def close(self, summary: dict) -> None:
+        """
+        Called once at the end of the run.
+        Args:
+            summary (dict): Totals of the whole run, see Timings.summary.
+        """
+
+class LogSink(TimingSink):
+    """
+    Log a line per frame, and the totals at the end, through the logging module.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None) -> None:
+        self.logger: logging.Logger = logger or logging.getLogger("game_of_life")
+
+    def emit(self, record: dict) -> None:
+        phases = " ".join(f"{name}={ms:.3f}ms" for name, ms in record["phases_ms"].items())
+        counters = " ".join(f"{name}={value}" for name, value in record["counters"].items())
+        self.logger.info("generation %d %s %s", record["generation"], phases, counters)
+
+    def close(self, summary: dict) -> None:
+        self.logger.info("totals %s", json.dumps(summary))
+
+class JsonLinesSink(TimingSink):
+    """
+    Append a JSON object per frame to a file, and a final {"summary": ...} line.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "a", encoding="utf-8")
+
+    def emit(self, record: dict) -> None:
+        self.file.write(json.dumps(record) + "\n")
+
+    def close(self, summary: dict) -> None:
+        self.file.write(json.dumps({"summary": summary}) + "\n")
+        self.file.close()
+
+class OverlaySink(TimingSink):
+    """
+    Keep the last frame's timings for display under the title.
+    """
+
+    def __init__(self) -> None:
+        self.text: Optional[str] = None
+
+    def emit(self, record: dict) -> None:
+        phases = " ".join(f"{name} {ms:.2f}ms" for name, ms in record["phases_ms"].items())
+        counters = " ".join(f"{name} {value:,}" for name, value in record["counters"].items())
+        self.text = f"{phases} | {counters}"
+
+    def overlay(self) -> Optional[str]:
+        return self.text
+
+class Timings:
+    """
+    Per-phase timers and counters for a run. Code under test wraps each phase
+    in `with timings.phase(name):` and bumps counters with `count`; the run
+    calls `end_frame` once per displayed frame, which hands that frame's
+    numbers to the sinks and adds them to the totals.
+
+    NO_TIMINGS is the disabled instance: its phases are a shared do-nothing
+    context manager and its other methods return at once, so instrumented
+    code costs a method call per phase when timing is off.
+
+    Recording and end_frame share a lock, so a producer thread can time its
+    phases while the display thread closes frames. Each phase name should
+    only be timed from one thread, since its context manager is shared.
+    """
+
+    def __init__(self, sinks: Optional[List[TimingSink]] = None, enabled: bool = True) -> None:
+        """
+        Args:
+            sinks (Optional[List[TimingSink]]): Where frame records go. Defaults to none (totals only).
+            enabled (bool): False for the do-nothing instance.
+        """
+        self.enabled: bool = enabled
+        self.sinks: List[TimingSink] = sinks or []
+        self.frame: Dict[str, float] = {}               # seconds per phase since the last frame
+        self.frame_counters: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+        self.frames: int = 0
+        self._phases: Dict[str, _Phase] = {}
+        self.lock: Lock = Lock()
+
+    def phase(self, name: str):
+        """
+        Get the context manager timing a phase.
+        Args:
+            name (str): Phase name, e.g. "step" or "render".
+        Returns:
+            The reusable context manager.
+        """
+        if not self.enabled:
+            return _NO_PHASE
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def count(self, name: str, amount: int = 1) -> None:
+        """
+        Add to a counter.
+        Args:
+            name (str): Counter name, e.g. "cells_evaluated".
+            amount (int): Amount to add. Defaults to 1.
+        """
+        if self.enabled:
+            with self.lock:
+                self.frame_counters[name] = self.frame_counters.get(name, 0) + amount
+
+    def end_frame(self, generation: int) -> None:
+        """
+        Close the current frame: report it to the sinks and add it to the totals.
+        Args:
+            generation (int): Generation the frame shows.
+        """
+        if not self.enabled:
+            return
+        with self.lock:
+            frame, counters = self.frame, self.frame_counters
+            self.frame, self.frame_counters = {}, {}
+        for name, seconds in frame.items():
+            self.totals[name] = self.totals.get(name, 0.0) + seconds
+        for name, value in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + value
+        self.frames += 1
+        record = {
+            "generation": generation,
+            "phases_ms": {name: seconds * 1000 for name, seconds in frame.items()},
+            "counters": counters,
+        }
+        for sink in self.sinks:
+            sink.emit(record)
+
+    def overlay(self) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Text the sinks want shown under the title, if any.
+        """
+        texts = [text for text in (sink.overlay() for sink in self.sinks) if text]
+        return " / ".join(texts) if texts else None
+
+    def summary(self) -> dict:
+        """
+        Returns:
+            dict: Frames, total seconds per phase and counter totals of the run so far.
+        """
+        return {"frames": self.frames, "phases_s": dict(self.totals), "counters": dict(self.counters)}
+
+    def close(self) -> None:
+        """
+        Hand the totals to the sinks and let them release their files.
+        """
+        if self.enabled:
+            for sink in self.sinks:
+                sink.close(self.summary())
+
+_NO_PHASE = _NoPhase()
+NO_TIMINGS = Timings(enabled=False)
+
+class Pattern:
+    """
+    The live cells of a board, as read from or written to a pattern file.
+    Only live cells are kept, so large mostly empty patterns stay cheap.
+
+    Two standard formats are supported: RLE (.rle), the run-length text
+    format used by most pattern collections, and Golly's Macrocell (.mc),
+    which stores the board as a deduplicated quadtree.
+    """
+
+    def __init__(self, cells: List[Tuple[int, int]], width: int, height: int, rule: Optional[str] = None) -> None:
+        """
+        Args:
+            cells (List[Tuple[int, int]]): (x, y) of every live cell.
+            width (int): Width of the pattern's bounding box.
+            height (int): Height of the pattern's bounding box.
+            rule (Optional[str]): Rulestring stored with the pattern, if any.
+        """
+        self.cells: List[Tuple[int, int]] = cells
+        self.width: int = width
+        self.height: int = height
+        self.rule: Optional[str] = rule
+
+    @classmethod
+    def from_grid(cls, grid: List[List[int]], rule: Optional[str] = None) -> "Pattern":
+        """
+        Collect the live cells of a grid.
+        Args:
+            grid (List[List[int]]): Grid of any backend type.
+            rule (Optional[str]): Rulestring to store with the pattern.
+        Returns:
+            Pattern: The pattern, the same size as the grid.
+        """
+        rows = [list(row) for row in grid]
+        cells = [(x, y) for y, row in enumerate(rows) for x, cell in enumerate(row) if cell]
+        return cls(cells, len(rows[0]) if rows else 0, len(rows), rule)
+
+    @classmethod
+    def read(cls, path: str) -> "Pattern":
+        """
+        Read a pattern file, picking the format from the extension (.mc for Macrocell, anything else RLE).
+        Args:
+            path (str): File to read.
+        Returns:
+            Pattern: The pattern.
+        """
+        with open(path, encoding="utf-8") as file:
+            text = file.read()
+        if path.lower().endswith(".mc"):
+            return cls.from_macrocell(text)
+        return cls.from_rle(text)
+
+    def write(self, path: str) -> None:
+        """
+        Write the pattern to a file, picking the format from the extension (.mc for Macrocell, anything else RLE).
+        Args:
+            path (str): File to write.
+        """
+        text = self.to_macrocell() if path.lower().endswith(".mc") else self.to_rle()
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    @classmethod
+    def from_rle(cls, text: str) -> "Pattern":
+        """
+        Parse an RLE pattern.
+        `b` is a dead cell, `o` a live one, `$` ends a row and `!` ends the
+        pattern, each optionally preceded by a repeat count.
+        Args:
+            text (str): Contents of the RLE file.
+        Returns:
+            Pattern: The pattern.
+        Raises:
+            ValueError: If the text has no pattern in it.
+        """
+        width = height = 0
+        rule: Optional[str] = None
+        body: List[str] = []
+        for line in text.splitlines():
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            header = re.match(r"x\s*=\s*(\d+)\s*,\s*y\s*=\s*(\d+)(?:\s*,\s*rule\s*=\s*(\S+))?", line)
+            if header and not body:
+                width, height, rule = int(header[1]), int(header[2]), header[3]
+                continue
+            body.append(line)
+        if not body:
+            raise ValueError("No RLE pattern found.")
+
+        cells: List[Tuple[int, int]] = []
+        x = y = 0
+        for count, tag in re.findall(r"(\d*)([^\d\s])", "".join(body)):
+            run = int(count or 1)
+            if tag == "!":
+                break
+            if tag == "$":
+                x, y = 0, y + run
+            elif tag in "b.":
+                x += run
+            else:       # `o`, or any state letter of a multi-state rule
+                cells.extend((x + i, y) for i in range(run))
+                x += run
+        width = max([width] + [x + 1 for x, _ in cells])
+        height = max([height] + [y + 1 for _, y in cells])
+        return cls(cells, width, height, rule)
+
+    def to_rle(self) -> str:
+        """
+        Encode the pattern as RLE, with lines wrapped at 70 characters.
+        Returns:
+            str: The RLE text.
+        """
+        def run(count: int, tag: str) -> str:
+            return f"{count}{tag}" if count > 1 else tag
+
+        rows: Dict[int, List[int]] = {}
+        for x, y in self.cells:
+            rows.setdefault(y, []).append(x)
+        tokens: List[str] = []
+        last_y = 0
+        for y in sorted(rows):
+            if y > last_y:
+                tokens.append(run(y - last_y, "$"))
+            last_y = y
+            xs = sorted(set(rows[y]))
+            x = 0
+            i = 0
+            while i < len(xs):
+                start = j = i
+                while j + 1 < len(xs) and xs[j + 1] == xs[j] + 1:
+                    j += 1
+                if xs[start] > x:
+                    tokens.append(run(xs[start] - x, "b"))
+                tokens.append(run(j - start + 1, "o"))
+                x = xs[j] + 1
+                i = j + 1
+        tokens.append("!")
+
+        header = f"x = {self.width}, y = {self.height}" + (f", rule = {self.rule}" if self.rule else "")
+        lines: List[str] = [header, ""]
+        for token in tokens:
+            if len(lines[-1]) + len(token) > 70:
+                lines.append("")
+            lines[-1] += token
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def from_macrocell(cls, text: str) -> "Pattern":
+        """
+        Parse a Macrocell pattern. Every line after the header is a node:
+        either an 8x8 leaf drawn with `.`, `*` and `$`, or `level nw ne sw se`
+        where the children are earlier line numbers (0 is an empty node).
+        The last node is the root. Shared subtrees are expanded as often as
+        they are used, but empty ones are skipped.
+        Args:
+            text (str): Contents of the Macrocell file.
+        Returns:
+            Pattern: The pattern, cropped to the bounding box of its live cells.
+        Raises:
+            ValueError: If the text isn't a Macrocell file.
+        """
+        lines = text.splitlines()
+        if not lines or not lines[0].startswith("[M2]"):
+            raise ValueError("Not a Macrocell file: missing the [M2] header.")
+        rule: Optional[str] = None
+        nodes: List[object] = [None]        # node 0 is empty
+        for line in lines[1:]:
+            line = line.strip()
+            if line.startswith("#R"):
+                rule = line[2:].strip()
+            elif not line or line.startswith("#"):
+                continue
+            elif line[0] in ".*$":
+                leaf = [(x, y) for y, row in enumerate(line.split("$")) for x, char in enumerate(row) if char == "*"]
+                nodes.append(leaf)
+            else:
+                nodes.append(tuple(int(value) for value in line.split()))
+
+        cells: List[Tuple[int, int]] = []
+
+        def expand(index: int, x0: int, y0: int) -> None:
+            node = nodes[index]
+            if index == 0:
+                return
+            if isinstance(node, list):
+                cells.extend((x0 + x, y0 + y) for x, y in node)
+                return
+            level, *children = node
+            if level == 1:      # children are cell states rather than nodes
+                cells.extend((x0 + dx, y0 + dy) for (dx, dy), state in zip(((0, 0), (1, 0), (0, 1), (1, 1)), children) if state)
+                return
+            half = 1 << (level - 1)
+            for (dx, dy), child in zip(((0, 0), (half, 0), (0, half), (half, half)), children):
+                expand(child, x0 + dx, y0 + dy)
+
+        expand(len(nodes) - 1, 0, 0)
+        if not cells:
+            return cls([], 0, 0, rule)
+        left = min(x for x, _ in cells)
+        top = min(y for _, y in cells)
+        cells = [(x - left, y - top) for x, y in cells]
+        return cls(cells, max(x for x, _ in cells) + 1, max(y for _, y in cells) + 1, rule)
+
+    def to_macrocell(self) -> str:
+        """
+        Encode the pattern as a Macrocell quadtree. Identical subtrees are
+        written once, so repetitive patterns stay small.
+        Returns:
+            str: The Macrocell text.
+        """
+        level = 3
+        while 1 << level < max(self.width, self.height):
+            level += 1
+        lines: List[str] = ["[M2] (game_of_life.py)"] + ([f"#R {self.rule}"] if self.rule else [])
+        ids: Dict[object, int] = {}
+
+        def build(cells: List[Tuple[int, int]], x0: int, y0: int, level: int) -> int:
+            if not cells:
+                return 0
+            if level == 3:
+                rows = [["."] * 8 for _ in range(8)]
+                for x, y in cells:
+                    rows[y - y0][x - x0] = "*"
+                drawn = ["".join(row).rstrip(".") for row in rows]
+                while drawn and not drawn[-1]:
+                    drawn.pop()
+                key: object = "$".join(drawn) + "$"
+            else:
+                half = 1 << (level - 1)
+                quadrants: List[List[Tuple[int, int]]] = [[], [], [], []]
+                for x, y in cells:
+                    quadrants[(x >= x0 + half) + 2 * (y >= y0 + half)].append((x, y))
+                key = (level,) + tuple(build(quadrant, x0 + dx, y0 + dy, level - 1)
+                                       for quadrant, (dx, dy) in zip(quadrants, ((0, 0), (half, 0), (0, half), (half, half))))
+            if key not in ids:
+                ids[key] = len(ids) + 1
+                lines.append(key if isinstance(key, str) else " ".join(map(str, key)))
+            return ids[key]
+
+        if build(list(self.cells), 0, 0, level) == 0:
+            lines.append("$")       # an empty pattern still needs a root node
+        return "\n".join(lines) + "\n"
+
+    def to_cells(self, width: int, height: int, x: Optional[int] = None, y: Optional[int] = None) -> bytes:
+        """
+        Draw the pattern onto an empty board, as row-major 0/1 bytes. Cells past the edges wrap around.
+        Args:
+            width (int): Width of the board.
+            height (int): Height of the board.
+            x (Optional[int]): Column of the pattern's left edge. Defaults to centering it.
+            y (Optional[int]): Row of the pattern's top edge. Defaults to centering it.
+        Returns:
+            bytes: width * height cells.
+        """
+        if x is None:
+            x = (width - self.width) // 2
+        if y is None:
+            y = (height - self.height) // 2
+        cells = bytearray(width * height)
+        for cell_x, cell_y in self.cells:
+            cells[(y + cell_y) % height * width + (x + cell_x) % width] = 1
+        return bytes(cells)
+
+BUILTIN_PATTERNS: Dict[StartPattern, str] = {
+    StartPattern.GLIDER_GUN: """x = 36, y = 9, rule = B3/S23
+24bo$22bobo$12b2o6b2o12b2o$11bo3bo4b2o12b2o$2o8bo5bo3b2o$2o8bo3bob2o4b
+obo$10bo5bo7bo$11bo3bo$12b2o!
+""",
+    StartPattern.R_PENTOMINO: """x = 3, y = 3, rule = B3/S23
+b2o$2o$bo!
+""",
+}
+
+def random_cells(width: int, height: int, density: float = 0.5, seed: Optional[int] = None) -> bytes:
     """
-    Enum class representing the neighborhood rules for the Game of Life simulation.
+    Fill a board with random cells in bulk: one random byte per cell, mapped
+    to 0/1 with a single bytes.translate, instead of a random call per cell.
+    The density is rounded to a multiple of 1/256.
+    Args:
+        width (int): Width of the board.
+        height (int): Height of the board.
+        density (float): Chance of each cell starting alive. Defaults to 0.5.
+        seed (Optional[int]): Random seed. Defaults to the global random state.
+    Returns:
+        bytes: width * height cells, row-major.
     """
-    MOORE = "moore"
-    VAN_NEUMANN = "van_neumann"
+    rng = random.Random(seed) if seed is not None else random
+    threshold: int = round(min(max(density, 0.0), 1.0) * 256)
+    return rng.randbytes(width * height).translate(bytes(1 if byte < threshold else 0 for byte in range(256)))
+
+
+# Binary recordings: a header followed by fixed-size frames, so frame i starts
+# at a known offset. Each frame is the generation number and then the rows
+# packed one bit per cell (bit x of a row is column x, little-endian).
+RECORDING_MAGIC = b"LIFEREC1"
+RECORDING_HEADER = struct.Struct("<8sIIH")      # magic, width, height, rule length
+FRAME_HEADER = struct.Struct("<Q")              # generation
+
+class Recorder:
+    """
+    Append the frames of a run to a binary recording file, for Recording to replay.
+    """
+
+    def __init__(self, path: str, width: int, height: int, rule: str = "") -> None:
+        """
+        Args:
+            path (str): File to write. It is overwritten.
+            width (int): Width of the grid.
+            height (int): Height of the grid.
+            rule (str): Rulestring stored in the header.
+        """
+        self.width: int = width
+        self.height: int = height
+        self.row_bytes: int = (width + 7) // 8
+        self.frames: int = 0
+        encoded = rule.encode("utf-8")
+        self.file = open(path, "wb")
+        self.file.write(RECORDING_HEADER.pack(RECORDING_MAGIC, width, height, len(encoded)) + encoded)
+
+    def write(self, generation: int, grid: List[List[int]]) -> None:
+        """
+        Append one frame.
+        Args:
+            generation (int): Generation of the grid.
+            grid (List[List[int]]): Grid of any backend type.
+        """
+        if np is not None and isinstance(grid, np.ndarray):
+            cells = np.packbits(grid.astype(bool), axis=1, bitorder="little").tobytes()
+        else:
+            packed = grid if isinstance(grid, PackedGrid) else PackedGrid.from_grid(grid)
+            cells = b"".join(row.to_bytes(self.row_bytes, "little") for row in packed.rows)
+        self.file.write(FRAME_HEADER.pack(generation) + cells)
+        self.frames += 1
+
+    def close(self) -> None:
+        """
+        Flush and close the file.
+        """
+        self.file.close()
+
+    def __enter__(self) -> "Recorder":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class Recording:
+    """
+    A binary recording, memory-mapped rather than read, so any frame can be
+    decoded straight from its offset without loading the rest of the file.
+    Frames are in generation order, which lets `seek` binary search them.
+    """
+
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): Recording written by Recorder.
+        Raises:
+            ValueError: If the file isn't a recording, or is empty or shorter than its header.
+        """
+        # The header is checked before mapping, since an empty file can't be mapped.
+        with open(path, "rb") as file:
+            header: bytes = file.read(RECORDING_HEADER.size)
+            if len(header) < RECORDING_HEADER.size:
+                raise ValueError(f"{path} is empty or too short to be a Game of Life recording.")
+            magic, self.width, self.height, rule_length = RECORDING_HEADER.unpack(header)
+            if magic != RECORDING_MAGIC:
+                raise ValueError(f"{path} is not a Game of Life recording.")
+            rule: bytes = file.read(rule_length)
+            if len(rule) < rule_length:
+                raise ValueError(f"{path} is cut short inside its header.")
+            # The map keeps its own handle on the file, so this one can be closed.
+            self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.rule: str = rule.decode("utf-8")
+        self.offset: int = RECORDING_HEADER.size + rule_length
+        self.row_bytes: int = (self.width + 7) // 8
+        self.frame_size: int = FRAME_HEADER.size + self.height * self.row_bytes
+
+    def __len__(self) -> int:
+        # A frame cut short by an interrupted run is ignored.
+        return (len(self.data) - self.offset) // self.frame_size
+
+    def generation(self, index: int) -> int:
+        """
+        Get the generation of a frame without decoding its cells.
+        Args:
+            index (int): Frame number.
+        Returns:
+            int: The generation.
+        """
+        return FRAME_HEADER.unpack_from(self.data, self.offset + index * self.frame_size)[0]
+
+    def frame(self, index: int) -> PackedGrid:
+        """
+        Decode a frame.
+        Args:
+            index (int): Frame number.
+        Returns:
+            PackedGrid: The grid of that frame.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError(f"Frame {index} is out of range.")
+        start = self.offset + index * self.frame_size + FRAME_HEADER.size
+        rows = [int.from_bytes(self.data[start + y * self.row_bytes:start + (y + 1) * self.row_bytes], "little")
+                for y in range(self.height)]
+        return PackedGrid(self.width, rows)
+
+    def seek(self, generation: int) -> int:
+        """
+        Find the frame showing a generation, or the last frame before it.
+        Args:
+            generation (int): Generation to look for.
+        Returns:
+            int: Frame number (0 if the generation is before the first frame).
+        """
+        low, high = 0, len(self)
+        while low < high:
+            middle = (low + high) // 2
+            if self.generation(middle) <= generation:
+                low = middle + 1
+            else:
+                high = middle
+        return max(low - 1, 0)
+
+    def close(self) -> None:
+        """
+        Unmap the file.
+        """
+        self.data.close()
+
+    def __enter__(self) -> "Recording":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
 class GameOfLife:
     """
     Represents the Game of Life simulation.
     """
 
-    def __init__(self, width: int, height: int, rules: NeighborhoodRules = NeighborhoodRules.MOORE) -> None:
+    def __init__(
+        self,
+        width: int,
+        height: int,
+        rules: NeighborhoodRules = NeighborhoodRules.MOORE,
+        backend: Backend = Backend.LOOP,
+        workers: int = 1,
+        detect_cycles: bool = False,
+        rulestring: str = "B3/S23",
+        seed: Optional[int] = None,
+        density: float = 0.5,
+        pattern: Optional[Pattern] = None,
+        timings: Optional[Timings] = None,
+    ) -> None:
         """
         Initialize the Game of Life grid.
         Args:
             width (int): Width of the grid.
             height (int): Height of the grid.
+            rules (NeighborhoodRules): Neighborhood rules to use.
+            backend (Backend): How the grid is stored and stepped.
+            workers (int): Worker processes for tiled parallel stepping (numpy backend only).
+            detect_cycles (bool): Keep a rolling hash of the board to detect repeated states.
+            rulestring (str): Birth/survival rule, see LifeRule.parse. Defaults to Conway's B3/S23.
+            seed (Optional[int]): Random seed for the starting board. Defaults to the global random state.
+            density (float): Chance of each cell starting alive. Defaults to 0.5.
+            pattern (Optional[Pattern]): Start from this pattern, centered on an empty board, instead of noise.
+            timings (Optional[Timings]): Collect per-phase timings of steps and runs. Defaults to off.
         """
+        if workers > 1 and backend != Backend.NUMPY:
+            raise ValueError("Parallel stepping with more than one worker needs the numpy backend.")
+        self.rule: LifeRule = LifeRule.parse(rulestring, rules)
+        if self.rule.radius > 1 and backend in (Backend.BITPACKED, Backend.HASHLIFE):
+            raise ValueError(f"The {backend.value} backend only supports rules with a radius of 1.")
+        if 0 in self.rule.birth and backend == Backend.SPARSE:
+            raise ValueError("The sparse backend can't run B0 rules, where empty space comes to life.")
         self.width: int = width
         self.height: int = height
-        self.rules: NeighborhoodRules = rules
-        self.grid: List[List[int]] = [[random.choice([0, 1]) for _ in range(width)] for _ in range(height)]
+        self.rules: NeighborhoodRules = self.rule.neighborhood     # Larger than Life rules pick their own
+        self.backend: Backend = backend
+        self.workers: int = workers
+        self.detect_cycles: bool = detect_cycles
         self.generation: int = 0
+        # Neighbor counts of the current grid, shared by stepping and the diagnostics.
+        self.counts: Optional[List[List[int]]] = None
+        self.counts_source: Optional[Tuple[object, int]] = None     # (grid, generation) they were counted for
+        self.recorder: Optional[Recorder] = None
+        self.timings: Timings = timings or NO_TIMINGS
+
+        if self.backend == Backend.NUMPY and np is None:
+            raise ImportError("The numpy backend requires numpy to be installed.")
+        if pattern is not None:
+            cells: bytes = pattern.to_cells(width, height)
+        else:
+            cells = random_cells(width, height, density, seed)
+        self.grid: List[List[int]] = self.grid_from_cells(cells)
 
-    def get_neighbors_van_neumann(self, x: int, y: int) -> int:
+        if self.backend == Backend.NUMPY:
+            if self.workers > 1:
+                self.tiles: TiledStepper = TiledStepper(self.grid, self.rule, self.workers)
+                self.grid = self.tiles.grid
+        elif self.backend == Backend.HASHLIFE:
+            self.hashlife: HashLife = HashLife(self.grid, self.rule)
+        elif self.backend == Backend.SPARSE:
+            self.live: Set[Tuple[int, int]] = {(index % width, index // width)
+                                               for index in (match.start() for match in re.finditer(b"\x01", cells))}
+            # Every live cell counts as changed so the first step looks at all of them.
+            self.changed: Set[Tuple[int, int]] = set(self.live)
+            self.cells_evaluated: int = 0
+
+        self.reset_cycle_detection()
+
+    def grid_from_cells(self, cells: bytes) -> List[List[int]]:
         """
-        Count the number of live neighbors for a given cell according to the
-        "Van Neumann Neighborhood" rules.
+        Build a grid of this game's backend type from row-major 0/1 bytes,
+        without going through a Python int per cell where it can be avoided.
         Args:
-            x (int): X-coordinate of the cell.
-            y (int): Y-coordinate of the cell.
+            cells (bytes): width * height cells.
         Returns:
-            int: Number of live neighbors.
+            List[List[int]]: The grid (a numpy array or PackedGrid for those backends).
         """
-        count: int = 0
-        for dx, dy in [(-1, 0), (1, 0), (0, -1), (0, 1)]:
-            nx, ny = (x + dx) % self.width, (y + dy) % self.height
-            count += self.grid[ny][nx]
-        return count
+        width: int = self.width
+        rows = range(0, width * self.height, width)
+        if self.backend == Backend.NUMPY:
+            return np.frombuffer(cells, dtype=np.uint8).reshape(self.height, width).copy()
+        if self.backend == Backend.BITPACKED:
+            # Bit x is column x, so each row is read as a binary number back to front.
+            digits: bytes = cells.translate(bytes.maketrans(b"\x00\x01", b"01"))
+            return PackedGrid(width, [int(digits[start:start + width][::-1] or b"0", 2) for start in rows])
+        return [list(cells[start:start + width]) for start in rows]
 
-    def get_neighbors_moore(self, x: int, y: int) -> int:
+    def reset_cycle_detection(self) -> None:
         """
-        Count the number of live neighbors for a given cell according to the
-        "Moore Neighborhood" rules.
+        Hash the whole board from scratch and forget previously seen states.
+        Call this after replacing the grid by hand.
+        """
+        self.state_hash: int = 0
+        self.seen_states: Dict[int, int] = {}
+        self.cycle: Optional[Tuple[int, int]] = None     # (first generation of the cycle, period)
+        if not self.detect_cycles:
+            return
+        if self.backend == Backend.NUMPY:
+            empty = np.zeros_like(self.grid)
+        elif self.backend == Backend.BITPACKED:
+            empty = PackedGrid(self.width, [0] * self.height)
+        else:
+            empty = [[0] * self.width for _ in range(self.height)]
+        self.state_hash = self.hash_differences(empty, self.grid)
+        self.seen_states[self.state_hash] = self.generation
+
+    def hash_differences(self, old: List[List[int]], new: List[List[int]]) -> int:
+        """
+        XOR together the keys of every cell that differs between two grids of
+        this game's backend type. XOR-ing the result into the state hash
+        updates it from `old` to `new`, so the cost scales with the number of
+        changed cells rather than the board area.
         Args:
-            x (int): X-coordinate of the cell.
-            y (int): Y-coordinate of the cell.
+            old (List[List[int]]): Previous grid.
+            new (List[List[int]]): Current grid.
         Returns:
-            int: Number of live neighbors.
+            int: XOR of the keys of the changed cells.
         """
-        count: int = 0
-        for dx in [-1, 0, 1]:
-            for dy in [-1, 0, 1]:
-                if dx == 0 and dy == 0:
-                    continue
-                nx, ny = (x + dx) % self.width, (y + dy) % self.height
-                count += self.grid[ny][nx]
-        return count
+        width: int = self.width
+        result: int = 0
+        if self.backend == Backend.NUMPY:
+            return xor_cell_keys_array(np.flatnonzero(old != new))
+        if self.backend == Backend.BITPACKED:
+            for y, (old_row, new_row) in enumerate(zip(old.rows, new.rows)):
+                diff = old_row ^ new_row
+                while diff:
+                    low = diff & -diff
+                    result ^= cell_key(y * width + low.bit_length() - 1)
+                    diff ^= low
+            return result
+        for y, (old_row, new_row) in enumerate(zip(old, new)):
+            if old_row != new_row:
+                for x, (old_cell, new_cell) in enumerate(zip(old_row, new_row)):
+                    if old_cell != new_cell:
+                        result ^= cell_key(y * width + x)
+        return result
+
+    def record_state(self, previous: List[List[int]]) -> None:
+        """
+        Update the rolling state hash after the grid moved on from `previous`,
+        and check whether this board has been seen before.
+        Args:
+            previous (List[List[int]]): The grid before the step.
+        """
+        if self.backend == Backend.SPARSE:
+            # The sparse step updates the grid in place but knows what changed.
+            for x, y in self.changed:
+                self.state_hash ^= cell_key(y * self.width + x)
+        else:
+            self.state_hash ^= self.hash_differences(previous, self.grid)
+        if self.cycle is not None:
+            return
+        first_seen = self.seen_states.get(self.state_hash)
+        if first_seen is not None:
+            self.cycle = (first_seen, self.generation - first_seen)
+        else:
+            self.seen_states[self.state_hash] = self.generation
+
+    def apply_cycle_action(self, target: int, action: CycleAction) -> bool:
+        """
+        Act on a detected cycle during a run.
+        Args:
+            target (int): Generation the run is heading for.
+            action (CycleAction): What to do about the cycle.
+        Returns:
+            bool: True if the run should stop now.
+        """
+        if self.cycle is None or action in (CycleAction.OFF, CycleAction.REPORT):
+            return False
+        if action == CycleAction.STOP:
+            return True
+        # The board repeats every `period` generations, so whole periods can be skipped.
+        _, period = self.cycle
+        self.generation += (target - self.generation) // period * period
+        return False
+
+    def close(self) -> None:
+        """
+        Release resources held by the backend (the worker pool and shared memory)
+        and finish any recording.
+        """
+        if self.workers > 1:
+            # The grid is a view of the shared buffers, so keep a private copy
+            # of the last generation before they are unlinked.
+            if self.tiles.buffers:
+                self.grid = self.tiles.grid.copy()
+            self.tiles.close()
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
+    def set_grid(self, grid: List[List[int]]) -> None:
+        """
+        Replace the board, converting the grid to this game's backend type.
+        Args:
+            grid (List[List[int]]): Rows of 0/1 cells, the same size as the board.
+        Raises:
+            ValueError: If the grid is the wrong size.
+        """
+        rows: List[List[int]] = [[1 if cell else 0 for cell in row] for row in grid]
+        if len(rows) != self.height or any(len(row) != self.width for row in rows):
+            raise ValueError(f"Expected a {self.width}x{self.height} grid.")
+        if self.backend == Backend.NUMPY:
+            if self.workers > 1:
+                self.tiles.grid[:] = rows       # the workers keep reading the shared buffer
+                self.grid = self.tiles.grid
+            else:
+                self.grid = np.array(rows, dtype=np.uint8)
+        elif self.backend == Backend.BITPACKED:
+            self.grid = PackedGrid.from_grid(rows)
+        else:
+            self.grid = rows
+        if self.backend == Backend.HASHLIFE:
+            self.hashlife.root = self.hashlife.from_grid(self.grid)
+        elif self.backend == Backend.SPARSE:
+            self.live = {(x, y) for y, row in enumerate(rows) for x, cell in enumerate(row) if cell}
+            self.changed = set(self.live)
+        self.invalidate_neighbor_counts()
+        self.reset_cycle_detection()
+
+    def load_pattern(self, pattern: Pattern, x: Optional[int] = None, y: Optional[int] = None) -> None:
+        """
+        Clear the board and place a pattern on it. Cells past the edges wrap around.
+        Args:
+            pattern (Pattern): Pattern to place.
+            x (Optional[int]): Column of the pattern's left edge. Defaults to centering it.
+            y (Optional[int]): Row of the pattern's top edge. Defaults to centering it.
+        """
+        cells: bytes = pattern.to_cells(self.width, self.height, x, y)
+        self.set_grid([cells[start:start + self.width] for start in range(0, len(cells), self.width)])
+
+    def to_pattern(self) -> Pattern:
+        """
+        Get the board as a Pattern, with the rule in the notation Golly reads.
+        Returns:
+            Pattern: The live cells of the whole board.
+        """
+        rule: str = self.rule.name
+        if not rule.startswith("R"):
+            rule = f"B{''.join(map(str, sorted(self.rule.birth)))}/S{''.join(map(str, sorted(self.rule.survival)))}"
+            if self.rule.neighborhood == NeighborhoodRules.VAN_NEUMANN:
+                rule += "V"
+        return Pattern.from_grid(self.grid, rule)
+
+    def load(self, path: str) -> None:
+        """
+        Load an RLE or Macrocell file onto the board, centered.
+        Args:
+            path (str): Pattern file (.rle or .mc).
+        """
+        self.load_pattern(Pattern.read(path))
+
+    def save(self, path: str) -> None:
+        """
+        Save the board as an RLE or Macrocell file.
+        Args:
+            path (str): Pattern file (.rle or .mc).
+        """
+        self.to_pattern().write(path)
+
+    def record(self, path: str) -> None:
+        """
+        Start recording the frames of runs to a binary file, beginning with the current board.
+        Args:
+            path (str): Recording file to write.
+        """
+        if self.recorder is not None:
+            self.recorder.close()
+        self.recorder = Recorder(path, self.width, self.height, self.rule.name)
+        self.recorder.write(self.generation, self.grid)
 
     def get_neighbors(self, x: int, y: int) -> int:
         """
         Count the number of live neighbors for a given cell according to the
-        "Neighborhood" rules.
+        "Neighborhood" rules. The neighborhood kernel comes from the rule, so
+        this works for any shape and radius without branching per cell.
         Args:
             x (int): X-coordinate of the cell.
             y (int): Y-coordinate of the cell.
         Returns:
             int: Number of live neighbors.
         """
-        if self.rules == NeighborhoodRules.VAN_NEUMANN:
-            return self.get_neighbors_van_neumann(x, y)
-        return self.get_neighbors_moore(x, y)
+        count: int = 0
+        for dx, dy in self.rule.offsets:
+            count += self.grid[(y + dy) % self.height][(x + dx) % self.width]
+        return count
+
+    def neighbor_counts(self) -> List[List[int]]:
+        """
+        Get the live neighbor count of every cell, counted in one pass over the
+        board and cached until the grid changes. Stepping a new generation or
+        assigning a new grid invalidates the cache by itself; call
+        invalidate_neighbor_counts after editing cells of the grid in place.
+        Returns:
+            List[List[int]]: Neighbor counts indexed [y][x] (a numpy array for the numpy backend).
+        """
+        if self.counts is None or self.counts_source[0] is not self.grid or self.counts_source[1] != self.generation:
+            with self.timings.phase("count"):
+                if self.backend == Backend.NUMPY:
+                    self.counts = self.count_neighbors_numpy()
+                else:
+                    self.counts = count_neighbors_lists(self.grid, self.rule)
+            self.counts_source = (self.grid, self.generation)
+        return self.counts
+
+    def invalidate_neighbor_counts(self) -> None:
+        """
+        Drop the cached neighbor counts, so the next neighbor_counts call recounts them.
+        """
+        self.counts = None
+        self.counts_source = None
 
     def next_generation(self) -> None:
         """
         Compute the next generation of the Game of Life.
         """
+        if self.backend == Backend.HASHLIFE:
+            self.advance(1)
+            return
+
+        previous = self.grid
+        with self.timings.phase("step"):
+            if self.backend == Backend.NUMPY:
+                self.next_generation_numpy()
+            elif self.backend == Backend.BITPACKED:
+                self.next_generation_bitpacked()
+            elif self.backend == Backend.SPARSE:
+                self.next_generation_sparse()
+            else:
+                self.next_generation_loop()
+        if self.backend != Backend.SPARSE:
+            # The counts were for the old grid. Holding on to them (and through
+            # counts_source, the old grid) would double the memory of a big board.
+            self.invalidate_neighbor_counts()
+        self.timings.count("cells_evaluated", self.cells_evaluated if self.backend == Backend.SPARSE
+                           else self.width * self.height)
+        if self.detect_cycles:
+            with self.timings.phase("hash"):
+                self.record_state(previous)
+
+    def next_generation_loop(self) -> None:
+        """
+        Compute the next generation with a per-cell loop over nested lists.
+        """
         new_grid: List[List[int]] = [[0 for _ in range(self.width)] for _ in range(self.height)]
+        table: List[List[int]] = self.rule.table
+        counts: List[List[int]] = self.neighbor_counts()
 
         for y in range(self.height):
             for x in range(self.width):
-                neighbors: int = self.get_neighbors(x, y)
-                if self.grid[y][x] == 1:
-                    if 2 <= neighbors <= 3:
-                        # print(f"live cell {x}, {y} = {neighbors}")
-                        new_grid[y][x] = 1
-                elif neighbors == 3:
-                    # print(f"new cell {x}, {y} = {neighbors}")
-                    new_grid[y][x] = 1
+                new_grid[y][x] = table[self.grid[y][x]][counts[y][x]]
         self.grid = new_grid
         self.generation += 1
 
+    def next_generation_sparse(self) -> None:
+        """
+        Compute the next generation by only evaluating the cells that changed
+        last generation and their neighbors. Any other cell has the same
+        neighborhood as before, so it cannot change either.
+        The grid is updated in place and the number of cells looked at is
+        stored in `cells_evaluated`. If neighbor counts are cached they are read
+        instead of rescanning, and patched around each changed cell so they
+        stay valid for the new generation.
+        """
+        offsets = self.rule.offsets
+        table: List[List[int]] = self.rule.table
+        candidates: Set[Tuple[int, int]] = set()
+        for x, y in self.changed:
+            candidates.add((x, y))
+            for dx, dy in offsets:
+                candidates.add(((x + dx) % self.width, (y + dy) % self.height))
+
+        counts: Optional[List[List[int]]] = None
+        if self.counts is not None and self.counts_source == (self.grid, self.generation):
+            counts = self.counts
+
+        births: List[Tuple[int, int]] = []
+        deaths: List[Tuple[int, int]] = []
+        for x, y in candidates:
+            cell: int = self.grid[y][x]
+            neighbors: int = counts[y][x] if counts is not None else self.get_neighbors(x, y)
+            if table[cell][neighbors] != cell:
+                (deaths if cell else births).append((x, y))
+
+        for x, y in births:
+            self.grid[y][x] = 1
+        for x, y in deaths:
+            self.grid[y][x] = 0
+        self.live.update(births)
+        self.live.difference_update(deaths)
+        self.changed = set(births)
+        self.changed.update(deaths)
+        self.cells_evaluated = len(candidates)
+        self.generation += 1
+        if counts is not None:
+            for delta, cells in ((1, births), (-1, deaths)):
+                for x, y in cells:
+                    for dx, dy in offsets:
+                        counts[(y - dy) % self.height][(x - dx) % self.width] += delta
+            self.counts_source = (self.grid, self.generation)
+
+    def advance(self, generations: int) -> None:
+        """
+        Advance the simulation by a number of generations.
+        The HASHLIFE backend jumps straight there in power-of-two steps, the
+        other backends step one generation at a time.
+        Args:
+            generations (int): Number of generations to advance.
+        """
+        if self.backend == Backend.HASHLIFE:
+            previous = self.grid
+            with self.timings.phase("step"):
+                self.grid = self.hashlife.advance(generations)
+            self.generation += generations
+            if self.detect_cycles:
+                found: bool = self.cycle is not None
+                with self.timings.phase("hash"):
+                    self.record_state(previous)
+                if not found and self.cycle is not None and generations > 1:
+                    # Boards are only compared once per jump, so the gap between the
+                    # repeats is a multiple of the period. The start is the first
+                    # compared board that is on the cycle, which may be up to a jump late.
+                    start, repeat = self.cycle
+                    self.cycle = (start, self.hashlife.period(repeat))
+            return
+        for _ in range(generations):
+            self.next_generation()
+
+    def count_neighbors_numpy(self) -> "np.ndarray":
+        """
+        Count the live neighbors of every cell of a numpy grid at once.
+        Returns:
+            np.ndarray: Array of neighbor counts with the same shape as the grid.
+        """
+        return count_neighbors_array(self.grid, self.rule)
+
+    def next_generation_numpy(self) -> None:
+        """
+        Compute the next generation of the Game of Life using whole-array operations.
+        With more than one worker the grid is stepped tile by tile on a process pool.
+        """
+        if self.workers > 1:
+            self.tiles.step()
+            self.grid = self.tiles.grid
+        else:
+            self.grid = self.rule.lookup[self.grid, self.neighbor_counts()]
+        self.generation += 1
+
+    def next_generation_bitpacked(self) -> None:
+        """
+        Compute the next generation on a PackedGrid.
+
+        Every row is handled as one big int, so each bitwise operation below
+        updates a whole row of cells at once. Neighbor counts are kept
+        "bit-sliced": bit x of r0, r1, r2, r3 are the 1s, 2s, 4s and 8s digits of
+        the count for column x, and they are summed with half/full adder logic.
+        The rule's counts are then matched against those digits.
+        """
+        width: int = self.width
+        mask: int = (1 << width) - 1
+        rows: List[int] = self.grid.rows
+        height: int = len(rows)
+        births: List[int] = [count for count, alive in enumerate(self.rule.table[0]) if alive]
+        survivals: List[int] = [count for count, alive in enumerate(self.rule.table[1]) if alive]
+
+        def matching(digits: Tuple[int, ...], counts: List[int]) -> int:
+            # Bit x is set if the count of column x is one of `counts`.
+            result = 0
+            for count in counts:
+                match = -1
+                for i, digit in enumerate(digits):
+                    match &= digit if count >> i & 1 else ~digit
+                result |= match
+            return result
+
+        def apply_rule(digits: Tuple[int, ...], mid: int) -> int:
+            return ((matching(digits, births) & ~mid) | (matching(digits, survivals) & mid)) & mask
+
+        def west(row: int) -> int:      # bit x holds the cell at x - 1, wrapping
+            return ((row << 1) | (row >> (width - 1))) & mask
+
+        def east(row: int) -> int:      # bit x holds the cell at x + 1, wrapping
+            return (row >> 1) | ((row & 1) << (width - 1))
+
+        new_rows: List[int] = [0] * height
+
+        if self.rules == NeighborhoodRules.VAN_NEUMANN:
+            for y in range(height):
+                up, mid, down = rows[y - 1], rows[y], rows[(y + 1) % height]
+                left, right = west(mid), east(mid)
+                # Two half adders, then add the two 2-bit sums together.
+                a0, a1 = up ^ down, up & down
+                b0, b1 = left ^ right, left & right
+                r0, carry = a0 ^ b0, a0 & b0
+                r1 = a1 ^ b1 ^ carry
+                r2 = (a1 & b1) | (carry & (a1 ^ b1))
+                new_rows[y] = apply_rule((r0, r1, r2), mid)
+        else:
+            # Horizontal 3-cell sums (2 bits each) are shared by the row above and below.
+            sum0: List[int] = [0] * height
+            sum1: List[int] = [0] * height
+            for y, row in enumerate(rows):
+                left, right = west(row), east(row)
+                sum0[y] = left ^ row ^ right
+                sum1[y] = (left & row) | (right & (left ^ row))
+
+            for y in range(height):
+                mid = rows[y]
+                left, right = west(mid), east(mid)
+                m0, m1 = left ^ right, left & right         # middle row without the cell itself
+                u0, u1 = sum0[y - 1], sum1[y - 1]
+                d0, d1 = sum0[(y + 1) % height], sum1[(y + 1) % height]
+                # up + down (0..6)
+                t0, carry = u0 ^ d0, u0 & d0
+                t1 = u1 ^ d1 ^ carry
+                t2 = (u1 & d1) | (carry & (u1 ^ d1))
+                # + middle (0..8)
+                r0, carry = t0 ^ m0, t0 & m0
+                r1 = t1 ^ m1 ^ carry
+                carry = (t1 & m1) | (carry & (t1 ^ m1))
+                r2, r3 = t2 ^ carry, t2 & carry
+                new_rows[y] = apply_rule((r0, r1, r2, r3), mid)
+
+        self.grid = PackedGrid(width, new_rows)
+        self.generation += 1
+
     def print_board_ascii(self) -> None:
         """
         Print the current state of the Game of Life grid.
@@ -125,9 +2034,10 @@ class GameOfLife:
         """
         Print the number of live neighbors for each cell in the Game of Life grid.
         """
+        counts: List[List[int]] = self.neighbor_counts()
         for y in range(self.height):
             for x in range(self.width):
-                neighbors: int = self.get_neighbors(x, y)
+                neighbors: int = counts[y][x]
                 print(f"{neighbors} ", end='')
             print()
 
@@ -136,54 +2046,526 @@ class GameOfLife:
         Print the number of live neighbors for each cell in the Game of Life grid using Rich.
         Colors: red=will die, green=will generate, white=will continue
         """
+        counts: List[List[int]] = self.neighbor_counts()
         for y in range(self.height):
             row = []
             for x in range(self.width):
-                neighbors: int = self.get_neighbors(x, y)
+                neighbors: int = counts[y][x]
                 cell_state = self.grid[y][x]
-                if cell_state == 1 and (neighbors < 2 or neighbors > 3):
+                next_state = self.rule.table[cell_state][neighbors]
+                if cell_state == 1 and next_state == 0:
                     color = "red"
-                elif cell_state == 0 and neighbors == 3:
+                elif cell_state == 0 and next_state == 1:
                     color = "green"
                 else:
                     color = "white"
                 row.append(f"[{color}]{neighbors}[/{color}]")
             rprint(" ".join(row))
 
-    def run(self, generations: int = 100) -> None:
+    def snapshot(self) -> List[List[int]]:
+        """
+        Copy the current grid, so it can be drawn while the simulation keeps
+        stepping. The copy has the same type as the grid.
+        Returns:
+            List[List[int]]: The copied grid.
+        """
+        if self.backend == Backend.NUMPY:
+            return self.grid.copy()
+        if self.backend == Backend.BITPACKED:
+            return PackedGrid(self.width, list(self.grid.rows))    # packed rows are immutable ints
+        return [list(row) for row in self.grid]
+
+    def get_title(self, generations: int, generation: Optional[int] = None, extra: str = "") -> Text:
+        """
+        Build the title shown above the board.
+        Args:
+            generations (int): Total number of generations of the run.
+            generation (Optional[int]): Generation being shown. Defaults to the current one.
+            extra (str): Appended to the first line, before any timings overlay. Defaults to nothing.
+        Returns:
+            Text: The title.
+        """
+        if generation is None:
+            generation = self.generation
+        title = Text(f"Conway's Game of Life: {self.width}x{self.height} - Rules: {self.rules.name} - Rule: {self.rule.name} - Backend: {self.backend.name} - Generation: {generation} / {generations}",
+                     style="bold magenta")
+        if self.backend == Backend.SPARSE:
+            title.append(f" - Cells evaluated: {self.cells_evaluated}")
+        if self.workers > 1:
+            title.append(f" - Workers: {self.workers}")
+        if self.cycle is not None:
+            start, period = self.cycle
+            title.append(f" - Cycle: period {period} from generation {start}")
+        title.append(extra)
+        overlay = self.timings.overlay()
+        if overlay:
+            title.append(f"\n{overlay}", style="dim")
+        return title
+
+    def run(
+        self,
+        generations: int = 100,
+        step: int = 1,
+        view: View = View.TABLE,
+        on_cycle: CycleAction = CycleAction.REPORT,
+    ) -> None:
         """
         Run the Game of Life simulation for a specified number of generations.
         Args:
             generations (int): Number of generations to simulate. Defaults to 100.
+            step (int): Generations to advance between frames. Defaults to 1.
+            view (View): How to draw the board. Defaults to a rich Table.
+            on_cycle (CycleAction): What to do when a repeated board is detected
+                (needs detect_cycles). Defaults to reporting it in the title.
         """
         console: Console = Console()
+        target: int = self.generation + generations
 
+        timings: Timings = self.timings
+
+        if view == View.HALFBLOCK:
+            with HalfBlockRenderer(console) as renderer:
+                while self.generation < target:
+                    with timings.phase("render"):
+                        renderer.draw(self.grid, self.get_title(generations))
+                    timings.count("rows_redrawn", renderer.lines_redrawn)
+                    self.advance(min(step, target - self.generation))
+                    if self.recorder is not None:
+                        with timings.phase("record"):
+                            self.recorder.write(self.generation, self.grid)
+                    timings.end_frame(self.generation)
+                    if self.apply_cycle_action(target, on_cycle):
+                        renderer.draw(self.grid, self.get_title(generations))
+                        break
+                    sleep(0.1)
+            return
 
         with Live(console=console, refresh_per_second=10, transient=False) as live:
-            for _ in range(generations):
-                title = Text(f"Conway's Game of Life: {self.width}x{self.height} - Rules: {self.rules.name} - Generation: {self.generation} / {generations}",
-                             style="bold magenta")
-                table: Table = Table(title=title, show_header=False, show_lines=True)
-                for row in self.grid:
-                    table.add_row(*['●' if cell else ' ' for cell in row])
-                self.next_generation()
-                live.update(table)
+            while self.generation < target:
+                with timings.phase("table"):
+                    table: Table = self.build_table(self.grid, self.get_title(generations))
+                self.advance(min(step, target - self.generation))
+                if self.recorder is not None:
+                    with timings.phase("record"):
+                        self.recorder.write(self.generation, self.grid)
+                with timings.phase("live_update"):
+                    live.update(table)
+                timings.count("rows_redrawn", self.height)
+                timings.end_frame(self.generation)
+                if self.apply_cycle_action(target, on_cycle):
+                    live.update(self.build_table(self.grid, self.get_title(generations)))
+                    break
                 sleep(0.1)
 
+    @staticmethod
+    def build_table(grid: List[List[int]], title: Text) -> Table:
+        """
+        Build the rich Table view of a grid.
+        Args:
+            grid (List[List[int]]): Grid to draw.
+            title (Text): Title of the table.
+        Returns:
+            Table: The table.
+        """
+        table: Table = Table(title=title, show_header=False, show_lines=True)
+        for row in grid:
+            table.add_row(*['●' if cell else ' ' for cell in row])
+        return table
+
+    def run_decoupled(
+        self,
+        generations: int = 100,
+        step: int = 1,
+        view: View = View.TABLE,
+        refresh_per_second: int = 10,
+        buffer_size: int = 16,
+        on_cycle: CycleAction = CycleAction.REPORT,
+    ) -> None:
+        """
+        Run the simulation on a background thread as fast as it can go, while
+        the display samples the newest frame refresh_per_second times a second.
+        Frames that are never shown are dropped. The title reports the
+        simulated generations per second and the number of dropped frames.
+        Args:
+            generations (int): Number of generations to simulate. Defaults to 100.
+            step (int): Generations to advance between frames. Defaults to 1.
+            view (View): How to draw the board. Defaults to a rich Table.
+            refresh_per_second (int): Display refresh rate. Defaults to 10.
+            buffer_size (int): Frames kept in the ring buffer. Defaults to 16.
+            on_cycle (CycleAction): What to do when a repeated board is detected
+                (needs detect_cycles). Defaults to reporting it in the title.
+        """
+        console: Console = Console()
+        ring: FrameRing = FrameRing(buffer_size)
+        ring.push(self.generation, self.snapshot())
+        target: int = self.generation + generations
+        stop: Event = Event()
+        errors: List[BaseException] = []
+
+        def produce() -> None:
+            try:
+                while self.generation < target and not stop.is_set():
+                    self.advance(min(step, target - self.generation))
+                    if self.recorder is not None:
+                        self.recorder.write(self.generation, self.grid)
+                    with self.timings.phase("snapshot"):
+                        ring.push(self.generation, self.snapshot())
+                    if self.apply_cycle_action(target, on_cycle):
+                        break
+            except BaseException as error:      # re-raised on the display thread
+                errors.append(error)
+
+        producer: Thread = Thread(target=produce, name="life-producer", daemon=True)
+        start_generation: int = self.generation
+        start_time: float = perf_counter()
+        shown_generation: Optional[int] = None
+        displayed: int = 0
+
+        if view == View.HALFBLOCK:
+            display = HalfBlockRenderer(console)
+        else:
+            display = Live(console=console, auto_refresh=False, transient=False)
+
+        producer.start()
+        try:
+            with display:
+                while True:
+                    finished = not producer.is_alive()
+                    generation, grid = ring.latest()
+                    if generation != shown_generation:
+                        shown_generation = generation
+                        displayed += 1
+                        rate = (generation - start_generation) / max(perf_counter() - start_time, 1e-9)
+                        title = self.get_title(generations, generation,
+                                               f" - {rate:,.0f} gens/s - Dropped frames: {ring.produced - displayed}")
+                        if view == View.HALFBLOCK:
+                            with self.timings.phase("render"):
+                                display.draw(grid, title)
+                            self.timings.count("rows_redrawn", display.lines_redrawn)
+                        else:
+                            with self.timings.phase("table"):
+                                table = self.build_table(grid, title)
+                            with self.timings.phase("live_update"):
+                                display.update(table, refresh=True)
+                            self.timings.count("rows_redrawn", self.height)
+                        self.timings.end_frame(generation)
+                    if finished:
+                        break
+                    sleep(1 / refresh_per_second)
+        finally:
+            stop.set()
+            producer.join()
+        if errors:
+            raise errors[0]
+
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    Get the peak resident set size of this process.
+    Returns:
+        Optional[int]: Peak RSS in bytes, or None where the resource module is missing.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024     # Linux reports KiB
+
+def benchmark(
+    width: int,
+    height: int,
+    generations: int,
+    rules: NeighborhoodRules = NeighborhoodRules.MOORE,
+    backend: Backend = Backend.LOOP,
+    workers: int = 1,
+    seed: int = 0,
+    rulestring: str = "B3/S23",
+    density: float = 0.5,
+) -> dict:
+    """
+    Step a seeded board for a number of generations with no rendering and
+    measure how fast it goes.
+    Args:
+        width (int): Width of the grid.
+        height (int): Height of the grid.
+        generations (int): Number of generations to time.
+        rules (NeighborhoodRules): Neighborhood rules to use.
+        backend (Backend): Grid storage and stepping backend.
+        workers (int): Worker processes for tiled parallel stepping.
+        seed (int): Random seed for the starting board.
+        rulestring (str): Birth/survival rule.
+        density (float): Chance of each cell starting alive.
+    Returns:
+        dict: The configuration and results, ready to be dumped as JSON.
+    """
+    game: GameOfLife = GameOfLife(width=width, height=height, rules=rules, backend=backend, workers=workers,
+                                  rulestring=rulestring, seed=seed, density=density)
+    latencies: List[float] = []
+    try:
+        start: float = perf_counter()
+        for _ in range(generations):
+            step_start = perf_counter()
+            game.next_generation()
+            latencies.append(perf_counter() - step_start)
+        elapsed: float = perf_counter() - start
+    finally:
+        game.close()
+
+    latencies.sort()
+
+    def percentile(fraction: float) -> float:
+        return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000 if latencies else 0.0
+
+    return {
+        "width": width,
+        "height": height,
+        "rules": rules.value,
+        "rule": game.rule.name,
+        "backend": backend.value,
+        "workers": workers,
+        "seed": seed,
+        "density": density,
+        "generations": generations,
+        "seconds": elapsed,
+        "generations_per_second": generations / elapsed if elapsed else 0.0,
+        "cell_updates_per_second": generations * width * height / elapsed if elapsed else 0.0,
+        "peak_rss_bytes": peak_rss_bytes(),
+        "latency_ms": {
+            "p50": percentile(0.50),
+            "p90": percentile(0.90),
+            "p99": percentile(0.99),
+            "max": latencies[-1] * 1000 if latencies else 0.0,
+        },
+    }
+
+def ensemble_batch(
+    seeds: List[int],
+    width: int,
+    height: int,
+    generations: int,
+    rule: LifeRule,
+    density: float = 0.5,
+) -> Iterator[dict]:
+    """
+    Step a batch of seeded soups together as one (batch, height, width) array.
+    Each board is hashed every generation, and a soup is finished as soon as
+    a board repeats: it has settled into a still life or an oscillator. Its
+    summary row is yielded and its board dropped from the batch, so the
+    batch shrinks as soups settle.
+    Args:
+        seeds (List[int]): One random seed per soup.
+        width (int): Width of the grid.
+        height (int): Height of the grid.
+        generations (int): Most generations to run a soup for.
+        rule (LifeRule): Rule to apply.
+        density (float): Chance of each cell starting alive.
+    Yields:
+        dict: One summary row per soup, in the order they finish.
+    """
+    # The same boards GameOfLife starts from with these seeds, so a soup can be watched with --seed.
+    cells: bytes = b"".join(random_cells(width, height, density, seed) for seed in seeds)
+    boards = np.frombuffer(cells, dtype=np.uint8).reshape(len(seeds), height, width)
+    active: List[int] = list(range(len(seeds)))      # soup index of each board in the batch
+    initial = boards.sum(axis=(1, 2))
+    seen: List[Dict[int, int]] = [{} for _ in seeds]
+
+    def summary(soup: int, board: "np.ndarray", generation: int, stabilized_at: Optional[int]) -> dict:
+        return {
+            "seed": seeds[soup],
+            "generations": generation,
+            "stabilized_at": stabilized_at,
+            "period": None if stabilized_at is None else generation - stabilized_at,
+            "initial_population": int(initial[soup]),
+            "final_population": int(board.sum()),
+        }
+
+    generation: int = 0
+    while True:
+        packed = np.packbits(boards.reshape(len(active), -1), axis=1)
+        keep: List[bool] = []
+        for row, soup in enumerate(active):
+            state = hash(packed[row].tobytes())
+            first_seen = seen[soup].get(state)
+            if first_seen is None:
+                seen[soup][state] = generation
+            else:
+                yield summary(soup, boards[row], generation, first_seen)
+                seen[soup] = {}
+            keep.append(first_seen is None)
+        if not all(keep):
+            boards = boards[np.array(keep)]
+            active = [soup for soup, kept in zip(active, keep) if kept]
+        if not active or generation == generations:
+            break
+        boards = step_array(boards, rule)
+        generation += 1
+
+    for row, soup in enumerate(active):
+        yield summary(soup, boards[row], generation, None)
+
+def _ensemble_worker(args: Tuple[List[int], int, int, int, LifeRule, float]) -> List[dict]:
+    """
+    Pool task: run one batch and return all of its rows.
+    """
+    return list(ensemble_batch(*args))
+
+def run_ensemble(
+    soups: int,
+    width: int,
+    height: int,
+    generations: int,
+    rule: LifeRule,
+    first_seed: int = 0,
+    batch_size: int = 64,
+    workers: int = 1,
+    density: float = 0.5,
+) -> Iterator[dict]:
+    """
+    Run many seeded random soups without rendering and stream a summary row
+    for each. The soups are split into batches that are stepped as single
+    arrays, and with more than one worker the batches run on a process pool.
+    Only the boards of the batches in flight are ever in memory.
+    Args:
+        soups (int): Number of soups.
+        width (int): Width of the grid.
+        height (int): Height of the grid.
+        generations (int): Most generations to run a soup for.
+        rule (LifeRule): Rule to apply.
+        first_seed (int): Seed of the first soup; the others count up from it.
+        batch_size (int): Soups stepped together in one array.
+        workers (int): Worker processes. Defaults to 1 (run in this process).
+        density (float): Chance of each cell starting alive. Defaults to 0.5.
+    Yields:
+        dict: Summary rows. With several workers they come batch by batch, in the order batches finish.
+    """
+    if np is None:
+        raise ImportError("Ensemble runs require numpy to be installed.")
+    end: int = first_seed + soups
+    batches = [list(range(start, min(start + batch_size, end))) for start in range(first_seed, end, batch_size)]
+    if workers <= 1:
+        for batch in batches:
+            yield from ensemble_batch(batch, width, height, generations, rule, density)
+        return
+    with Pool(workers) as pool:
+        tasks = [(batch, width, height, generations, rule, density) for batch in batches]
+        for rows in pool.imap_unordered(_ensemble_worker, tasks):
+            yield from rows
+
+def replay(path: str, view: View = View.TABLE, generation: int = 0, refresh_per_second: int = 10) -> None:
+    """
+    Play back a binary recording without simulating anything. The file is
+    memory-mapped and the first frame is found by seeking, so starting late
+    in a long recording is as quick as starting at the beginning.
+    Args:
+        path (str): Recording written by GameOfLife.record.
+        view (View): How to draw the board. Defaults to a rich Table.
+        generation (int): Generation to start from. Defaults to the first frame.
+        refresh_per_second (int): Frames shown per second. Defaults to 10.
+    """
+    console: Console = Console()
+    with Recording(path) as recording:
+        if not len(recording):
+            console.print(f"{path} has no frames.")
+            return
+        last: int = recording.generation(len(recording) - 1)
+
+        def title(index: int) -> Text:
+            return Text(f"Replay: {recording.width}x{recording.height} - Rule: {recording.rule} - Generation: {recording.generation(index)} / {last}",
+                        style="bold magenta")
 
+        start: int = recording.seek(generation)
+        if view == View.HALFBLOCK:
+            with HalfBlockRenderer(console) as renderer:
+                for index in range(start, len(recording)):
+                    renderer.draw(recording.frame(index), title(index))
+                    sleep(1 / refresh_per_second)
+            return
+        with Live(console=console, auto_refresh=False, transient=False) as live:
+            for index in range(start, len(recording)):
+                live.update(GameOfLife.build_table(recording.frame(index), title(index)), refresh=True)
+                sleep(1 / refresh_per_second)
 
 @app.command()
 def main(
     width: int = typer.Option(32, "--width", "-w", help="Width of the grid"),
     height: int = typer.Option(32, "--height", "-h", help="Height of the grid"),
     generations: int = typer.Option(200, "--generations", "-g", help="Number of generations to simulate"),
-    rules: NeighborhoodRules = typer.Option(NeighborhoodRules.MOORE, "--rules", "-r", help="Neighborhood rules to use")
+    rules: NeighborhoodRules = typer.Option(NeighborhoodRules.MOORE, "--rules", "-r", help="Neighborhood rules to use"),
+    rulestring: Optional[str] = typer.Option(None, "--rulestring", help="Birth/survival rule, e.g. B36/S23, seeds, daynight or R5,C0,M1,S34..58,B34..45,NM. Defaults to the loaded pattern's rule, or B3/S23"),
+    backend: Backend = typer.Option(Backend.LOOP, "--backend", "-b", help="Grid storage and stepping backend"),
+    step: int = typer.Option(1, "--step", "-s", help="Generations to advance per frame (use with the hashlife backend for big jumps)"),
+    workers: int = typer.Option(1, "--workers", help="Worker processes for tiled parallel stepping (numpy backend only)"),
+    view: View = typer.Option(View.TABLE, "--view", "-v", help="How to draw the board"),
+    decoupled: bool = typer.Option(False, "--decoupled", "-d", help="Simulate on a background thread as fast as possible and sample frames for display"),
+    fps: int = typer.Option(10, "--fps", help="Display refresh rate in decoupled mode"),
+    seed: Optional[int] = typer.Option(None, "--seed", help="Random seed for the starting board"),
+    density: float = typer.Option(0.5, "--density", help="Chance of each cell starting alive on a random board"),
+    start: StartPattern = typer.Option(StartPattern.RANDOM, "--pattern", "-p", help="Start from random noise or a built-in pattern centered on an empty board"),
+    on_cycle: CycleAction = typer.Option(CycleAction.OFF, "--on-cycle", help="Detect repeated boards and report them, stop, or fast-forward through the cycle"),
+    bench: bool = typer.Option(False, "--bench", help="Run headless for the given generations and print timing results as JSON"),
+    load: Optional[str] = typer.Option(None, "--load", help="Start from an RLE (.rle) or Macrocell (.mc) pattern file, centered; the board grows to fit it (to a power of two with hashlife)"),
+    save: Optional[str] = typer.Option(None, "--save", help="Save the final board as RLE (.rle) or Macrocell (.mc)"),
+    record: Optional[str] = typer.Option(None, "--record", help="Record every frame of the run to a binary file"),
+    replay_file: Optional[str] = typer.Option(None, "--replay", help="Play back a recording instead of simulating"),
+    replay_from: int = typer.Option(0, "--replay-from", help="Generation to start the playback from"),
+    profile: Profile = typer.Option(Profile.OFF, "--profile", help="Report per-phase timings and counters of each frame (log goes to game_of_life.log)"),
+    profile_file: str = typer.Option("timings.jsonl", "--profile-file", help="File the jsonl profile is appended to"),
+    ensemble: int = typer.Option(0, "--ensemble", help="Run this many seeded random soups headless (numpy) and print a JSON summary line per soup"),
+    batch_size: int = typer.Option(64, "--batch-size", help="Soups stepped together as one array in ensemble mode"),
 ):
     """
     Run Conway's Game of Life simulation with specified parameters.
     """
-    game: GameOfLife = GameOfLife(width=width, height=height, rules=rules)
-    game.run(generations=generations)
+    if replay_file is not None:
+        replay(replay_file, view=view, generation=replay_from, refresh_per_second=fps)
+        return
+    if ensemble:
+        rule = LifeRule.parse(rulestring or "B3/S23", rules)
+        for row in run_ensemble(ensemble, width, height, generations, rule, first_seed=seed or 0,
+                                batch_size=batch_size, workers=workers, density=density):
+            print(json.dumps(row), flush=True)
+        return
+    if bench:
+        results = benchmark(width=width, height=height, generations=generations, rules=rules,
+                            backend=backend, workers=workers, seed=0 if seed is None else seed,
+                            rulestring=rulestring or "B3/S23", density=density)
+        print(json.dumps(results, indent=2))
+        return
+    pattern: Optional[Pattern] = None
+    if load is not None:
+        pattern = Pattern.read(load)
+    elif start != StartPattern.RANDOM:
+        pattern = Pattern.from_rle(BUILTIN_PATTERNS[start])
+    if pattern is not None:
+        if backend == Backend.HASHLIFE:
+            # HashLife needs power-of-two sides, so a side that has to grow goes to the next one
+            width = width if width >= pattern.width else 1 << (pattern.width - 1).bit_length()
+            height = height if height >= pattern.height else 1 << (pattern.height - 1).bit_length()
+        width, height = max(width, pattern.width), max(height, pattern.height)
+        rulestring = rulestring or pattern.rule
+    timings: Timings = NO_TIMINGS
+    if profile == Profile.LOG:
+        logging.basicConfig(level=logging.INFO, filename="game_of_life.log", format="%(asctime)s %(message)s")
+        timings = Timings([LogSink()])
+    elif profile == Profile.JSONL:
+        timings = Timings([JsonLinesSink(profile_file)])
+    elif profile == Profile.OVERLAY:
+        timings = Timings([OverlaySink()])
+    game: GameOfLife = GameOfLife(width=width, height=height, rules=rules, backend=backend, workers=workers,
+                                  detect_cycles=on_cycle != CycleAction.OFF, rulestring=rulestring or "B3/S23",
+                                  seed=seed, density=density, pattern=pattern, timings=timings)
+    try:
+        if record is not None:
+            game.record(record)
+        if decoupled:
+            game.run_decoupled(generations=generations, step=step, view=view, refresh_per_second=fps, on_cycle=on_cycle)
+        else:
+            game.run(generations=generations, step=step, view=view, on_cycle=on_cycle)
+        if save is not None:
+            game.save(save)
+    finally:
+        game.close()
+        timings.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,305 @@
+# Game of Life viewer built with Textual, on top of ../rich/game_of_life.py.
+# The board can be far bigger than the terminal: only the visible viewport is
+# drawn, one cached Strip per line, and a line is only re-rendered when the
+# cells behind it change. The simulation runs on a worker thread.
+#
+# Keys: arrows pan, + / - zoom, space pauses, c centers the view, q quits.
+
+from __future__ import annotations
+import sys
+from pathlib import Path
+from time import perf_counter, sleep
+from threading import Event, Lock
+from typing import Dict, List, Optional
+
+import typer
+from rich.segment import Segment
+from rich.style import Style
+from textual import work, on
+from textual.app import App, ComposeResult
+from textual.binding import Binding
+from textual.geometry import Region
+from textual.message import Message
+from textual.strip import Strip
+from textual.widget import Widget
+from textual.widgets import Footer, Static
+from textual.worker import Worker, get_current_worker
+
+try:
+    import numpy as np
+except ImportError:     # only used to speed up sampling numpy grids
+    np = None
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "rich"))
+from game_of_life import (  # noqa: E402
+    BUILTIN_PATTERNS, Backend, FrameRing, GameOfLife, HalfBlockRenderer, NeighborhoodRules, Pattern, StartPattern,
+)
+
+
+def sample_viewport(grid, left: int, top: int, columns: int, rows: int, scale: int) -> List[bytes]:
+    """
+    Sample the visible part of a grid. Every sample covers a scale x scale
+    block of cells and is 1 if any of them is alive, so zoomed out views
+    still show sparse patterns. Only cells inside the viewport are read.
+    Args:
+        grid: Grid of any GameOfLife backend.
+        left (int): First column of the viewport.
+        top (int): First row of the viewport.
+        columns (int): Samples per row.
+        rows (int): Rows of samples.
+        scale (int): Cells per sample along each side.
+    Returns:
+        List[bytes]: One bytes of 0/1 samples per row, cut short at the edges of the board.
+    """
+    if np is not None and isinstance(grid, np.ndarray):
+        region = grid[top:top + rows * scale, left:left + columns * scale]
+        height, width = region.shape
+        if scale > 1 and height and width:
+            region = np.pad(region, ((0, -height % scale), (0, -width % scale)))
+            region = region.reshape(region.shape[0] // scale, scale, region.shape[1] // scale, scale).max(axis=(1, 3))
+        return [row.tobytes() for row in region.astype(np.uint8)]
+
+    samples: List[bytes] = []
+    for y in range(top, min(top + rows * scale, len(grid)), scale):
+        band = [grid[row][left:left + columns * scale] for row in range(y, min(y + scale, len(grid)))]
+        merged = list(map(max, *band)) if len(band) > 1 else list(band[0])
+        if scale > 1:
+            merged = [max(merged[x:x + scale]) for x in range(0, len(merged), scale)]
+        samples.append(bytes(merged))
+    return samples
+
+
+class LifeView(Widget, can_focus=True):
+    """Scrollable, zoomable view of a GameOfLife board. \n
+    Two rows of samples share each line of text (half-block glyphs)."""
+
+    DEFAULT_CSS = """
+    LifeView { width: 1fr; height: 1fr; }
+    """
+
+    BINDINGS = [
+        Binding("left", "pan(-1, 0)", "Pan", show=False),
+        Binding("right", "pan(1, 0)", "Pan", show=False),
+        Binding("up", "pan(0, -1)", "Pan", show=False),
+        Binding("down", "pan(0, 1)", "Pan", show=False),
+        Binding("plus,equals_sign", "zoom(-1)", "Zoom in"),
+        Binding("minus", "zoom(1)", "Zoom out"),
+        Binding("space", "toggle_pause", "Pause"),
+        Binding("c", "center", "Center"),
+    ]
+
+    class FrameShown(Message):
+        """Posted after a frame was drawn, for the status bar."""
+        def __init__(self, generation: int, rate: float, lines_redrawn: int) -> None:
+            super().__init__()
+            self.generation = generation
+            self.rate = rate
+            self.lines_redrawn = lines_redrawn
+
+    def __init__(self, game: GameOfLife, step: int = 1, fps: int = 30, style: str = "bold green", **kwargs):
+        super().__init__(**kwargs)
+        self.game = game
+        self.step = step
+        self.fps = fps
+        self.scale = 1          # cells per sample along each side, always a power of two
+        self.left = 0           # board cell at the top left of the view
+        self.top = 0
+        self.style = Style.parse(style)
+        self.ring = FrameRing(4)
+        self.paused = Event()
+        self.stepping = Lock()                  # held by the simulation thread while it runs
+        self.simulation: Optional[Worker] = None
+        self._glyph_table: Dict[int, str] = {code: glyph for code, glyph in enumerate(HalfBlockRenderer.GLYPHS)}
+        self._codes: List[bytes] = []           # glyph codes behind each cached line
+        self._strips: List[Strip] = []
+        self._shown: Optional[int] = None       # generation on screen
+        self._stale = True                      # the viewport moved since the last draw
+        self._start = (game.generation, perf_counter())
+
+    def on_mount(self) -> None:
+        self.ring.push(self.game.generation, self.game.snapshot())
+        self.simulation = self.simulate()
+        self.set_interval(1 / self.fps, self.poll)
+
+    @work(thread=True, exclusive=True)
+    def simulate(self) -> None:
+        """Step the game as fast as it goes and publish snapshots to the ring. \n
+        The UI thread only ever takes the newest one, so it never waits on this."""
+        worker = get_current_worker()
+        with self.stepping:
+            while not worker.is_cancelled:
+                if self.paused.is_set():
+                    sleep(0.05)
+                    continue
+                self.game.advance(self.step)
+                self.ring.push(self.game.generation, self.game.snapshot())
+
+    def stop_simulation(self) -> None:
+        """Cancel the simulation and wait for its thread to finish the step it is on. \n
+        Cancelling a thread worker doesn't stop the thread, so without the wait it
+        could still be stepping when the game releases its pool and shared memory."""
+        if self.simulation is not None:
+            self.simulation.cancel()
+            with self.stepping:
+                pass
+
+    ###~ Drawing ~###
+
+    def poll(self) -> None:
+        generation, grid = self.ring.latest()
+        if generation == self._shown and not self._stale:
+            return
+        self._shown, self._stale = generation, False
+        redrawn = self.draw(grid)
+        start_generation, start_time = self._start
+        rate = (generation - start_generation) / max(perf_counter() - start_time, 1e-9)
+        self.post_message(self.FrameShown(generation, rate, redrawn))
+
+    def draw(self, grid) -> int:
+        """Rebuild the strips of the lines whose glyphs changed and refresh only those lines.
+        Returns the number of lines redrawn."""
+        width, height = self.size
+        samples = sample_viewport(grid, self.left, self.top, width, height * 2, self.scale)
+        if len(self._codes) != height:
+            self._codes = [b""] * height
+            self._strips = [Strip.blank(width)] * height
+            self.refresh()
+        redrawn = 0
+        for line in range(height):
+            upper = samples[2 * line] if 2 * line < len(samples) else b""
+            lower = samples[2 * line + 1] if 2 * line + 1 < len(samples) else b""
+            lower = lower.ljust(len(upper), b"\0")
+            codes = bytes(top + 2 * bottom for top, bottom in zip(upper, lower))
+            if codes == self._codes[line]:
+                continue
+            self._codes[line] = codes
+            text = codes.decode("latin-1").translate(self._glyph_table)
+            self._strips[line] = Strip([Segment(text, self.style)], len(text)).extend_cell_length(width)
+            self.refresh(Region(0, line, width, 1))
+            redrawn += 1
+        return redrawn
+
+    def render_line(self, y: int) -> Strip:
+        if y < len(self._strips):
+            return self._strips[y]
+        return Strip.blank(self.size.width)
+
+    def on_resize(self) -> None:
+        self._codes = []
+        self.clamp()
+
+    ###~ Viewport ~###
+
+    def clamp(self) -> None:
+        """Keep the viewport on the board and mark it for redrawing."""
+        width, height = self.size
+        self.left = max(0, min(self.left, self.game.width - width * self.scale))
+        self.top = max(0, min(self.top, self.game.height - height * 2 * self.scale))
+        self._stale = True
+
+    def action_pan(self, dx: int, dy: int) -> None:
+        width, height = self.size
+        self.left += dx * max(1, width * self.scale // 4)
+        self.top += dy * max(1, height * 2 * self.scale // 4)
+        self.clamp()
+
+    def action_zoom(self, direction: int) -> None:
+        """Halve or double the scale, keeping the middle of the view in place."""
+        largest = 1
+        while largest < max(self.game.width, self.game.height):
+            largest *= 2
+        scale = min(max(self.scale * 2 if direction > 0 else self.scale // 2, 1), largest)
+        width, height = self.size
+        middle_x = self.left + width * self.scale // 2
+        middle_y = self.top + height * self.scale
+        self.scale = scale
+        self.left = middle_x - width * scale // 2
+        self.top = middle_y - height * scale
+        self.clamp()
+
+    def action_center(self) -> None:
+        width, height = self.size
+        self.left = (self.game.width - width * self.scale) // 2
+        self.top = (self.game.height - height * 2 * self.scale) // 2
+        self.clamp()
+
+    def action_toggle_pause(self) -> None:
+        if self.paused.is_set():
+            self.paused.clear()
+        else:
+            self.paused.set()
+        self._stale = True      # so the status bar picks it up
+
+
+class LifeViewer(App):
+
+    CSS = """
+    #status { height: 1; background: $boost; }
+    """
+
+    BINDINGS = [Binding("q", "quit", "Quit")]
+
+    def __init__(self, game: GameOfLife, step: int = 1, fps: int = 30):
+        super().__init__()
+        self.game = game
+        self.step = step
+        self.fps = fps
+
+    def compose(self) -> ComposeResult:
+        yield Static(id="status")
+        self.life_view = LifeView(self.game, step=self.step, fps=self.fps)
+        yield self.life_view
+        yield Footer()
+
+    def on_mount(self) -> None:
+        view = self.query_one(LifeView)
+        view.focus()
+        view.action_center()
+
+    def on_unmount(self) -> None:
+        self.life_view.stop_simulation()
+        self.game.close()
+
+    @on(LifeView.FrameShown)
+    def frame_shown(self, event: LifeView.FrameShown) -> None:
+        view = self.query_one(LifeView)
+        paused = " - Paused" if view.paused.is_set() else ""
+        self.query_one("#status", Static).update(
+            f"{self.game.width}x{self.game.height} - Rule: {self.game.rule.name} - Backend: {self.game.backend.name}"
+            f" - Generation: {event.generation} - {event.rate:,.0f} gens/s - Zoom: 1/{view.scale}"
+            f" - View: {view.left},{view.top} - Lines redrawn: {event.lines_redrawn}{paused}"
+        )
+
+
+def main(
+    width: int = typer.Option(512, "--width", "-w", help="Width of the grid"),
+    height: int = typer.Option(512, "--height", "-h", help="Height of the grid"),
+    rules: NeighborhoodRules = typer.Option(NeighborhoodRules.MOORE, "--rules", "-r", help="Neighborhood rules to use"),
+    rulestring: Optional[str] = typer.Option(None, "--rulestring", help="Birth/survival rule. Defaults to the loaded pattern's rule, or B3/S23"),
+    backend: Backend = typer.Option(Backend.NUMPY, "--backend", "-b", help="Grid storage and stepping backend"),
+    step: int = typer.Option(1, "--step", "-s", help="Generations to advance per frame"),
+    workers: int = typer.Option(1, "--workers", help="Worker processes for tiled parallel stepping (numpy backend only)"),
+    fps: int = typer.Option(30, "--fps", help="Display refresh rate"),
+    seed: Optional[int] = typer.Option(None, "--seed", help="Random seed for the starting board"),
+    density: float = typer.Option(0.5, "--density", help="Chance of each cell starting alive on a random board"),
+    start: StartPattern = typer.Option(StartPattern.RANDOM, "--pattern", "-p", help="Start from random noise or a built-in pattern"),
+    load: Optional[str] = typer.Option(None, "--load", help="Start from an RLE (.rle) or Macrocell (.mc) pattern file"),
+):
+    """
+    Watch a Game of Life board of any size in a pannable, zoomable Textual view.
+    """
+    pattern: Optional[Pattern] = None
+    if load is not None:
+        pattern = Pattern.read(load)
+    elif start != StartPattern.RANDOM:
+        pattern = Pattern.from_rle(BUILTIN_PATTERNS[start])
+    if pattern is not None:
+        width, height = max(width, pattern.width), max(height, pattern.height)
+        rulestring = rulestring or pattern.rule
+    game = GameOfLife(width=width, height=height, rules=rules, backend=backend, workers=workers,
+                      rulestring=rulestring or "B3/S23", seed=seed, density=density, pattern=pattern)
+    LifeViewer(game, step=step, fps=fps).run()
+
+
+if __name__ == "__main__":
+    typer.run(main)
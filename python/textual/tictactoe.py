@@ -4,10 +4,21 @@
 # No dependencies are required other than Textual.
 
 from __future__ import annotations
-from enum import Enum
-from copy import deepcopy
-from asyncio import sleep
+import os
+import re
+import sys
+import mmap
+from argparse import ArgumentParser
+from array import array
+from bisect import bisect_left
+from enum import Enum, Flag, auto
 from itertools import product
+from pathlib import Path
+from random import getrandbits
+from multiprocessing import forkserver, get_all_start_methods, get_context, resource_tracker
+from time import perf_counter, time
+from collections import deque
+from threading import Event, Lock
 
 
 # Textual imports
@@ -35,6 +46,908 @@ class PlayerState(Enum):
     PLAYER2 = 2
 
 
+class Bound(Enum):
+    """How a score stored in the transposition table relates to the real score. \n
+    EXACT is the real score. LOWER means the search was cut off by beta, so the
+    real score is at least this. UPPER means no move beat alpha, so the real
+    score is at most this."""
+    EXACT = 0
+    LOWER = 1
+    UPPER = 2
+
+
+class MoveOrdering(Flag):
+    """Heuristics the minimax uses to try the most promising moves first, so
+    alpha-beta pruning cuts off more of the tree. \n
+    Combine them with |. NONE tries the empty cells in board order."""
+    NONE = 0
+    TT_MOVE = auto()    # The best move the transposition table has for this position
+    KILLERS = auto()    # Moves that caused a cutoff at the same depth elsewhere in the tree
+    HISTORY = auto()    # Moves that caused cutoffs anywhere, weighted by how much was pruned
+    CENTRE = auto()     # Cells on the most winning lines (centre and diagonals) first
+    ALL = TT_MOVE | KILLERS | HISTORY | CENTRE
+
+
+class SearchStats:
+    """Cutoff counters for one computer turn, to see how well the move ordering works. \n
+    A cutoff on the first move tried means the ordering picked the right move.
+    cutoffs_by counts which heuristic placed each move that caused a cutoff."""
+
+    def __init__(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
+        self.symmetric_moves_skipped = 0
+        self.cutoffs_by = {heuristic: 0 for heuristic in (MoveOrdering.TT_MOVE, MoveOrdering.KILLERS,
+                                                          MoveOrdering.HISTORY, MoveOrdering.CENTRE, MoveOrdering.NONE)}
+
+    def record_cutoff(self, source: MoveOrdering, first: bool):
+        self.cutoffs += 1
+        self.first_move_cutoffs += first
+        self.cutoffs_by[source] += 1
+
+    def __str__(self) -> str:
+        rate = self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0
+        sources = ", ".join(f"{heuristic.name}: {count}" for heuristic, count in self.cutoffs_by.items())
+        return (f"Cutoffs on the first move: {rate:.0%} of {self.cutoffs} ({sources})\n"
+                f"Symmetric moves skipped: {self.symmetric_moves_skipped}")
+
+
+class SearchTimeout(Exception):
+    """Raised inside the minimax when the time budget for a move runs out."""
+
+
+class TranspositionTable:
+    """Fixed-size table of positions the minimax has already searched, indexed
+    by the Zobrist hash of the board. \n
+    It is kept for a whole game, so positions searched on earlier turns are
+    reused. When two positions land in the same slot, the entry from the
+    deeper search wins, unless the stored one is left over from an earlier turn."""
+
+    def __init__(self, size_bits: int = 18):
+        """ | Arg       | Description
+            |-----------|-------------
+            | size_bits | - The table holds 2**size_bits entries """
+
+        self.mask = (1 << size_bits) - 1
+        # Each slot is (key, depth, score, bound, best_move, age) or None.
+        self.slots: list[tuple | None] = [None] * (1 << size_bits)
+        self.age = 0
+        self.hits = 0
+        self.cutoffs = 0
+
+    def new_search(self):
+        """Called before every computer turn. Entries from older turns become
+        the first to be replaced, and the hit counters restart."""
+        self.age += 1
+        self.hits = 0
+        self.cutoffs = 0
+
+    def probe(self, key: int) -> tuple | None:
+        entry = self.slots[key & self.mask]
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry
+        return None
+
+    def store(self, key: int, depth: int, score: float, bound: Bound, best_move: tuple[int, int] | None):
+        index = key & self.mask
+        old = self.slots[index]
+        if old is None or old[0] == key or old[5] != self.age or depth >= old[1]:
+            self.slots[index] = (key, depth, score, bound, best_move, self.age)
+
+
+def winning_lines(size: int) -> list[int]:
+    """Bit masks of every row, column and both diagonals of a size x size board. \n
+    Cell (row, col) is bit row * size + col."""
+
+    full_row = (1 << size) - 1
+    lines = [full_row << (row * size) for row in range(size)]
+    first_column = sum(1 << (row * size) for row in range(size))
+    lines += [first_column << col for col in range(size)]
+    lines.append(sum(1 << (i * size + i) for i in range(size)))
+    lines.append(sum(1 << (i * size + size - 1 - i) for i in range(size)))
+    return lines
+
+
+def symmetries(size: int) -> list[list[int]]:
+    """The 8 rotations and reflections of a size x size board, as cell
+    permutations: symmetries(size)[k][cell] is where cell ends up under
+    symmetry k. Symmetry 0 leaves the board as it is."""
+
+    last = size - 1
+    transforms = (
+        lambda row, col: (row, col),
+        lambda row, col: (col, last - row),             # Rotate 90
+        lambda row, col: (last - row, last - col),      # Rotate 180
+        lambda row, col: (last - col, row),             # Rotate 270
+        lambda row, col: (row, last - col),             # Mirror left to right
+        lambda row, col: (last - row, col),             # Mirror top to bottom
+        lambda row, col: (col, row),                    # Mirror on the main diagonal
+        lambda row, col: (last - col, last - row),      # Mirror on the anti-diagonal
+    )
+    permutations = []
+    for transform in transforms:
+        permutation = [0] * (size * size)
+        for row, col in product(range(size), range(size)):
+            image_row, image_col = transform(row, col)
+            permutation[row * size + col] = image_row * size + image_col
+        permutations.append(permutation)
+    return permutations
+
+
+def line_weights(size: int) -> list[int]:
+    """What a line is worth to the only player with pieces on it, by how many
+    pieces they have there. Each piece more is worth 4 times as much. Empty
+    lines are worth nothing, and full ones are wins, which are scored apart."""
+
+    return [0] + [4 ** (pieces - 1) for pieces in range(1, size)] + [0]
+
+
+# Every grid size the game offers, worked out once. Bigger boards are
+# computed on demand by BitBoard.
+WIN_MASKS: dict[int, list[int]] = {size: winning_lines(size) for size in range(2, 6)}
+SYMMETRIES: dict[int, list[list[int]]] = {size: symmetries(size) for size in range(2, 6)}
+HASH_BITS = 64
+HASH_MASK = (1 << HASH_BITS) - 1
+
+
+class BitBoard:
+    """The board as the minimax sees it: one integer per player, with bit
+    row * size + col set for each of their pieces. \n
+    Placing or removing a piece, finding the empty cells, checking a line
+    and updating the Zobrist hash are each a single bitwise operation.
+    The Grid widget keeps using the list of lists int_board; from_int_board
+    and to_int_board convert between the two. \n
+    hash holds the Zobrist hashes of all 8 rotations and reflections of the
+    board side by side, 64 bits each, so one XOR updates all of them. The
+    smallest of the 8 (canonical) is the same for every symmetric copy of a
+    position, and is what the transposition table is keyed on. \n
+    score is a guess of how good the position is for the AI (player 2), for
+    searches that stop before the game ends: every line that only one player
+    has pieces on counts for them, by line_weights. Only the lines through
+    the cell played can change, so make_move and undo_move update it as they go."""
+
+    def __init__(self, size: int, zobrist_keys: list[tuple[int, int]]):
+        """ | Arg          | Description
+            |--------------|-------------
+            | size         | - Width and height of the board
+            | zobrist_keys | - A pair of random keys (player 1, player 2) for every cell, in bit order """
+
+        self.size = size
+        self.full = (1 << size * size) - 1
+        self.pieces = [0, 0]            # player 1, player 2
+        self.zobrist_keys = zobrist_keys
+        self.hash = 0
+        lines = WIN_MASKS.get(size) or winning_lines(size)
+        # Only the lines through the cell just played can have been completed.
+        self.cell_lines = [[line for line in lines if line >> cell & 1] for cell in range(size * size)]
+        self.weights = line_weights(size)
+        self.score = 0
+        self.score_changes: list[int] = []         # One per move made, for undo_move
+        self.symmetries = SYMMETRIES.get(size) or symmetries(size)
+        self.inverses = [[0] * (size * size) for _ in self.symmetries]
+        for inverse, permutation in zip(self.inverses, self.symmetries):
+            for cell, image in enumerate(permutation):
+                inverse[image] = cell
+        # A piece on a cell adds, under symmetry k, the key of the cell it is moved to.
+        self.hash_keys = [tuple(sum(zobrist_keys[permutation[cell]][player] << (HASH_BITS * k)
+                                    for k, permutation in enumerate(self.symmetries))
+                                for player in (0, 1))
+                          for cell in range(size * size)]
+
+    @classmethod
+    def from_int_board(cls, int_board: list[list[int]], zobrist_keys: list[tuple[int, int]]) -> BitBoard:
+        board = cls(len(int_board), zobrist_keys)
+        for row, col in product(range(board.size), range(board.size)):
+            player = int_board[row][col]
+            if player != 0:
+                board.make_move(row * board.size + col, player)
+        return board
+
+    @classmethod
+    def from_pieces(cls, size: int, pieces: tuple[int, int], zobrist_keys: list[tuple[int, int]]) -> BitBoard:
+        board = cls(size, zobrist_keys)
+        for player in (1, 2):
+            remaining = pieces[player - 1]
+            while remaining:
+                move = remaining & -remaining
+                remaining ^= move
+                board.make_move(move.bit_length() - 1, player)
+        return board
+
+    def to_int_board(self) -> list[list[int]]:
+        return [[1 if self.pieces[0] >> (row * self.size + col) & 1 else
+                 2 if self.pieces[1] >> (row * self.size + col) & 1 else 0
+                 for col in range(self.size)] for row in range(self.size)]
+
+    def empty_cells(self) -> int:
+        """Mask of the empty cells."""
+        return self.full & ~(self.pieces[0] | self.pieces[1])
+
+    def is_full(self) -> bool:
+        return self.pieces[0] | self.pieces[1] == self.full
+
+    def make_move(self, cell: int, player: int) -> bool:
+        """Place a piece on a cell (bit index). \n
+        Returns True if the move wins."""
+
+        own, other = self.pieces[player - 1], self.pieces[2 - player]
+        change = 0
+        for line in self.cell_lines[cell]:
+            if other & line:
+                if not own & line:
+                    change += self.weights[(other & line).bit_count()]     # Blocks the other player's line
+            else:
+                count = (own & line).bit_count()
+                change += self.weights[count + 1] - self.weights[count]
+        if player == 1:
+            change = -change
+        self.score += change
+        self.score_changes.append(change)
+
+        own |= 1 << cell
+        self.pieces[player - 1] = own
+        self.hash ^= self.hash_keys[cell][player - 1]
+        for line in self.cell_lines[cell]:
+            if own & line == line:
+                return True
+        return False
+
+    def undo_move(self, cell: int, player: int):
+        """Take back a move made with make_move."""
+
+        self.pieces[player - 1] ^= 1 << cell
+        self.hash ^= self.hash_keys[cell][player - 1]
+        self.score -= self.score_changes.pop()
+
+    def canonical(self) -> tuple[int, int]:
+        """Returns the smallest hash of the 8 symmetric copies of this board,
+        and the symmetry that gives it."""
+
+        key, symmetry = self.hash & HASH_MASK, 0
+        for k in range(1, 8):
+            other = self.hash >> (HASH_BITS * k) & HASH_MASK
+            if other < key:
+                key, symmetry = other, k
+        return key, symmetry
+
+    def stabilizer(self) -> list[int]:
+        """The symmetries (other than 0) that leave this board unchanged."""
+
+        board = self.hash & HASH_MASK
+        return [k for k in range(1, 8) if self.hash >> (HASH_BITS * k) & HASH_MASK == board]
+
+    def to_canonical(self, move: tuple[int, int] | None, symmetry: int) -> tuple[int, int] | None:
+        """Map a (row, col) move on this board to the same move on its canonical copy."""
+
+        if move is None or move[0] is None:
+            return move
+        return divmod(self.symmetries[symmetry][move[0] * self.size + move[1]], self.size)
+
+    def from_canonical(self, move: tuple[int, int] | None, symmetry: int) -> tuple[int, int] | None:
+        """Map a (row, col) move on the canonical copy back to this board."""
+
+        if move is None or move[0] is None:
+            return move
+        return divmod(self.inverses[symmetry][move[0] * self.size + move[1]], self.size)
+
+
+class MinimaxSearch:
+    """The AI: a time-boxed, iteratively deepening alpha-beta minimax over a
+    BitBoard, with a transposition table and move ordering. \n
+    One is made per game by the GameManager, so the table and the history
+    scores carry over between turns. With more than one worker, each search
+    depth is split over a process pool, one root move per task."""
+
+    def __init__(
+        self,
+        grid_size: int,
+        time_budget_ms: int = 1000,
+        move_ordering: MoveOrdering = MoveOrdering.ALL,
+        workers: int = 1,
+        zobrist_keys: list[tuple[int, int]] | None = None
+    ):
+        """ | Arg            | Description
+            |----------------|-------------
+            | grid_size      | - Width and height of the board
+            | time_budget_ms | - How long the AI may think about each move, in milliseconds
+            | move_ordering  | - Which MoveOrdering heuristics the minimax uses
+            | workers        | - Processes to split the search over. 1 searches in the calling thread
+            | zobrist_keys   | - Keys to hash boards with. New random ones by default """
+
+        self.grid_size = grid_size
+        self.time_budget_ms = time_budget_ms
+        self.move_ordering = move_ordering
+        # One random 64 bit key per cell and player, in BitBoard bit order. A board's
+        # hash is the XOR of the keys of its pieces, so placing or removing a
+        # piece is a single XOR.
+        self.zobrist_keys = zobrist_keys or [(getrandbits(64), getrandbits(64)) for _ in range(grid_size ** 2)]
+        # Scores up to max_eval are guesses from BitBoard.score. Wins score
+        # win_score minus the moves it takes, which is always above max_eval,
+        # so a sure win beats any guess and quicker wins score higher.
+        self.max_eval = len(WIN_MASKS.get(grid_size) or winning_lines(grid_size)) * line_weights(grid_size)[grid_size - 1]
+        self.win_score = self.max_eval + grid_size ** 2 + 1
+        self.transposition_table = TranspositionTable()     # Shared by every turn of this game
+        self.max_depth = grid_size ** 2
+        self.deadline = None
+        self.completed_depth = 0
+        # How many moves deep symmetric duplicate moves are skipped. Deeper
+        # down, boards are almost never symmetric, so it isn't worth checking.
+        self.symmetry_plies = 3
+        # Move ordering: cells sorted by how many winning lines go through them,
+        # then by closeness to the middle. Killers are kept per depth, history
+        # per player and cell.
+        size = grid_size
+        lines = WIN_MASKS.get(size) or winning_lines(size)
+        self.centre_order = sorted(range(size * size), key=lambda cell: (
+            -sum(line >> cell & 1 for line in lines),
+            abs(2 * (cell // size) - size + 1) + abs(2 * (cell % size) - size + 1)))
+        self.centre_rank = [0] * (size * size)
+        for rank, cell in enumerate(self.centre_order):
+            self.centre_rank[cell] = rank
+        self.killers: list[list[int | None]] = [[None, None] for _ in range(size * size + 1)]
+        self.history = [[0] * (size * size), [0] * (size * size)]
+        self.search_stats = SearchStats()
+        self.minimax_counter = 0
+        self.pruning_counter = 0
+        self.depth_limit_counter = 0
+
+        self.turn = 0
+        self.workers = workers
+        self.pool = None
+        self.stop = Event()         # Set by close, makes a running search give up
+        self.running = Lock()       # Held while choose_move runs
+        if workers > 1:
+            # The best score any worker has found at the root this iteration. Every
+            # worker reads it before searching a root move, as its alpha.
+            self.shared_alpha = SEARCH_CONTEXT.Value('i', 0)
+            self.stop = SEARCH_CONTEXT.Event()
+            self.pool = SEARCH_CONTEXT.Pool(
+                processes=workers,
+                initializer=_init_search_worker,
+                initargs=(grid_size, move_ordering, self.zobrist_keys, self.shared_alpha, self.stop),
+            )
+
+    @staticmethod
+    def start_helpers():
+        """Start the processes multiprocessing needs besides the workers (the
+        resource tracker, and the fork server where there is one). Call it before
+        a Textual app runs: the app swaps out stderr, which they can't start without."""
+
+        resource_tracker.ensure_running()
+        if SEARCH_CONTEXT.get_start_method() == "forkserver":
+            forkserver.ensure_running()
+
+    def close(self):
+        """Stop a running search, wait for it to return, then shut down the pool."""
+
+        self.stop.set()
+        with self.running:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool = None
+
+    def choose_move(self, board: BitBoard) -> tuple[int, int]:
+        """Pick the AI's (player 2's) move on this board."""
+
+        with self.running:
+            self.minimax_counter = 0
+            self.pruning_counter = 0
+            self.depth_limit_counter = 0
+            self.new_search()
+            return self.iterative_deepening(board)
+
+    def new_search(self):
+        """Reset the per-turn search state. Killers are tied to depths below the
+        current position, so they start over. History is halved, so moves that
+        were good on earlier turns still go first, but fade out."""
+
+        self.turn += 1
+        self.transposition_table.new_search()
+        self.killers = [[None, None] for _ in self.killers]
+        self.history = [[score // 2 for score in scores] for scores in self.history]
+        self.search_stats = SearchStats()
+
+    def iterative_deepening(self, board: BitBoard) -> tuple[int, int]:
+        """Search one move deeper at a time until the time budget runs out, and
+        return the best move of the last search that finished. \n
+        Each search stores its best moves in the transposition table, and the
+        next one tries those first, so it prunes much more than a cold search.
+        The first search (one move deep) always finishes, so there is always a move,
+        unless close stops the search before that."""
+
+        self.deadline = None
+        start = perf_counter()
+        best_move = (None, None)
+        self.completed_depth = 0
+        moves_left = self.grid_size ** 2 - (board.pieces[0] | board.pieces[1]).bit_count()
+        for max_depth in range(1, moves_left + 1):
+            if self.stop.is_set():
+                break
+            self.max_depth = max_depth
+            try:
+                if self.pool is not None and moves_left > 1:
+                    score, best_move = self.split_root(board)
+                else:
+                    score, best_move = self.minimax(
+                        board,
+                        depth=0,
+                        alpha = float('-inf'),
+                        beta = float('inf'),
+                        is_maximizing=True           # AI is maximizer
+                    )
+            except SearchTimeout:
+                break
+            self.completed_depth = max_depth
+            if abs(score) > self.max_eval:
+                break           # A forced win or loss was found; searching deeper can't change it.
+            self.deadline = start + self.time_budget_ms / 1000
+            if perf_counter() > self.deadline:
+                break
+        return best_move
+
+    def split_root(self, board: BitBoard) -> tuple[int, tuple[int, int]]:
+        """Search every root move on the process pool, to the current max_depth. \n
+        Each worker searches its move with alpha set one below the best root score
+        found so far, and raises that score when it beats it. A move that can't
+        reach the best score fails low without being searched out exactly, and a
+        move that ties it still gets its exact score. Ties go to the move first in
+        centre_order, as in the serial minimax, so both pick the same move.
+        Only as many tasks as there are workers are queued at a time, and no new
+        one is sent once the deadline has passed.
+        Raises SearchTimeout if any move ran out of time, or the search was stopped."""
+
+        key, symmetry = board.canonical()
+        entry = self.transposition_table.probe(key)
+        tt_move = board.from_canonical(entry[4], symmetry) if entry is not None else None
+        moves = self.unique_moves(board, [cell for cell, _ in self.order_moves(board, 0, 2, tt_move)])
+        self.shared_alpha.value = -self.win_score
+        # perf_counter isn't comparable between processes, so the deadline goes to the workers as wall clock time
+        deadline = None if self.deadline is None else time() + self.deadline - perf_counter()
+
+        best_score, best_move = float('-inf'), (None, None)
+        timed_out = False
+        pending = deque()
+
+        def collect():
+            nonlocal best_score, best_move, timed_out
+            cell, task = pending.popleft()
+            score, nodes, pruned, depth_limits = task.get()
+            self.minimax_counter += nodes
+            self.pruning_counter += pruned
+            self.depth_limit_counter += depth_limits
+            if score is None:
+                timed_out = True
+            elif score > best_score or score == best_score and self.centre_rank[cell] < self.centre_rank[
+                    best_move[0] * self.grid_size + best_move[1]]:
+                best_score, best_move = score, divmod(cell, self.grid_size)
+
+        for cell in moves:
+            if len(pending) == self.workers:
+                collect()
+            if timed_out or self.stop.is_set() or self.deadline is not None and perf_counter() > self.deadline:
+                timed_out = True
+                break
+            pending.append((cell, self.pool.apply_async(
+                _search_root_move, (tuple(board.pieces), cell, self.max_depth, self.turn, deadline))))
+        while pending:
+            collect()
+        if timed_out:
+            raise SearchTimeout()
+        # Keep the root's best move for the next iteration's move ordering
+        self.transposition_table.store(key, self.max_depth, best_score, Bound.EXACT,
+                                       board.to_canonical(best_move, symmetry))
+        return best_score, best_move
+
+    def search_root_move(self, board: BitBoard, cell: int, alpha: float) -> int:
+        """Score one root move for the AI, searching the rest of the tree with
+        this alpha. A score at or below alpha is only an upper bound."""
+
+        if board.make_move(cell, 2):
+            score = self.win_score - 1
+        elif board.is_full():
+            score = 0
+        else:
+            score, _ = self.minimax(board, 1, False, alpha, float('inf'))
+        board.undo_move(cell, 2)
+        return score
+
+    def unique_moves(self, board: BitBoard, moves: list) -> list:
+        """Drop the moves that a symmetry of the board turns into another move of
+        the list. Those lead to the same position (mirrored), so they score the
+        same. Of each such group, the move that comes first in centre_order is
+        kept, whatever order the moves are in, so the pick between equal scores
+        (see minimax) doesn't change. Takes cells or (cell, heuristic) pairs."""
+
+        stabilizer = board.stabilizer()
+        if not stabilizer:
+            return moves
+        empty = board.empty_cells()
+        kept = 0
+        covered = 0
+        for cell in self.centre_order:
+            if empty >> cell & 1 and not covered >> cell & 1:
+                kept |= 1 << cell
+                for k in stabilizer:
+                    covered |= 1 << board.symmetries[k][cell]
+        unique = [move for move in moves if kept >> (move[0] if isinstance(move, tuple) else move) & 1]
+        self.search_stats.symmetric_moves_skipped += len(moves) - len(unique)
+        return unique
+
+    def order_moves(
+        self,
+        board: BitBoard,
+        depth: int,
+        player: int,
+        tt_move: tuple[int, int] | None
+    ) -> list[tuple[int, MoveOrdering]]:
+        """ | Arg     | Description
+            |---------|-------------
+            | board   | - The position to order the moves of
+            | depth   | - Depth of the position, for the killer moves
+            | player  | - The player to move, for the history scores
+            | tt_move | - Best move the transposition table has for this position, if any
+
+            Returns:
+                list[tuple[int, MoveOrdering]]: every empty cell, each with the heuristic that placed it"""
+
+        ordering = self.move_ordering
+        empty = board.empty_cells()
+        moves = []
+        if MoveOrdering.TT_MOVE in ordering and tt_move is not None and tt_move[0] is not None:
+            cell = tt_move[0] * self.grid_size + tt_move[1]
+            if empty >> cell & 1:
+                moves.append((cell, MoveOrdering.TT_MOVE))
+                empty ^= 1 << cell
+        if MoveOrdering.KILLERS in ordering:
+            for cell in self.killers[depth]:
+                if cell is not None and empty >> cell & 1:
+                    moves.append((cell, MoveOrdering.KILLERS))
+                    empty ^= 1 << cell
+
+        history = self.history[player - 1] if MoveOrdering.HISTORY in ordering else None
+        centre = MoveOrdering.CENTRE in ordering
+        cells = self.centre_order if centre else range(self.grid_size * self.grid_size)
+        rest = [cell for cell in cells if empty >> cell & 1]
+        if history is not None:
+            rest.sort(key=history.__getitem__, reverse=True)    # Stable, so ties keep the order above
+            for cell in rest:
+                if history[cell] > 0:
+                    moves.append((cell, MoveOrdering.HISTORY))
+                else:
+                    moves.append((cell, MoveOrdering.CENTRE if centre else MoveOrdering.NONE))
+        else:
+            source = MoveOrdering.CENTRE if centre else MoveOrdering.NONE
+            moves.extend((cell, source) for cell in rest)
+        return moves
+
+    def measure_move_ordering(self, int_board: list[list[int]], max_depth: int) -> dict[str, int]:
+        """Search a position to a fixed depth with no ordering, each heuristic on
+        its own, and all of them, and count the nodes each search visits. \n
+        Uses a fresh transposition table, so the game's own is left alone."""
+
+        saved = self.transposition_table, self.move_ordering, self.max_depth, self.deadline, self.history
+        nodes = {}
+        for ordering in (MoveOrdering.NONE, MoveOrdering.TT_MOVE, MoveOrdering.KILLERS,
+                         MoveOrdering.HISTORY, MoveOrdering.CENTRE, MoveOrdering.ALL):
+            self.transposition_table = TranspositionTable()
+            self.move_ordering = ordering
+            self.max_depth = max_depth
+            self.deadline = None
+            self.history = [[0] * len(self.history[0]), [0] * len(self.history[0])]
+            self.new_search()
+            self.minimax_counter = self.pruning_counter = self.depth_limit_counter = 0
+            self.minimax(BitBoard.from_int_board(int_board, self.zobrist_keys), depth=0,
+                         alpha=float('-inf'), beta=float('inf'), is_maximizing=True)
+            nodes[ordering.name] = self.minimax_counter
+        self.transposition_table, self.move_ordering, self.max_depth, self.deadline, self.history = saved
+        return nodes
+
+    def minimax(
+        self,
+        board: BitBoard,
+        depth: int,
+        is_maximizing: bool,
+        alpha: float,
+        beta: float
+    ) -> tuple[int, tuple[int, int]]:       # score, best_move coordinates
+        """ | Arg           | Description 
+            |---------------|---------------------
+            | board         | - The current game board state, changed in place and restored before returning
+            | depth         | - Current depth in the game tree
+            | is_maximizing | - True if AI's turn (maximizing), False if human's turn (minimizing)
+
+            Returns:
+                tuple[int, tuple[int, int]]: best_score, (best_move coordinates)"""
+
+        self.minimax_counter += 1
+        if self.minimax_counter % 1024 == 0 and (
+                self.stop.is_set() or self.deadline is not None and perf_counter() > self.deadline):
+            raise SearchTimeout()      # The board is left mid-search; iterative_deepening drops it.
+
+        # Game over positions never get here: the move that ends the game is
+        # scored in the loop below, where board.make_move reports a win.
+
+        # max_depth is raised one move at a time by iterative_deepening.
+        max_depth = self.max_depth
+        if depth == max_depth:
+            self.depth_limit_counter += 1
+            return board.score, None        # Open lines guess, kept up to date by make_move
+
+        # Transposition table: win/loss scores are stored relative to this node
+        # (win_score - moves until the win) so they stay valid when the same position
+        # turns up at another depth. Entries only count if they searched at
+        # least as many moves ahead as we still would. The root always searches,
+        # so it always has a move to return.
+        remaining = max_depth - depth
+        alpha_start, beta_start = alpha, beta
+        key, symmetry = board.canonical()
+        entry = self.transposition_table.probe(key)
+        # Moves are stored as played on the canonical copy of the board
+        tt_move = board.from_canonical(entry[4], symmetry) if entry is not None else None
+        if entry is not None and depth > 0 and entry[1] >= remaining:
+            stored, bound, stored_move = entry[2], entry[3], tt_move
+            score = stored - depth if stored > self.max_eval else stored + depth if stored < -self.max_eval else stored
+            if bound == Bound.EXACT:
+                self.transposition_table.cutoffs += 1
+                return score, stored_move
+            if bound == Bound.LOWER:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
+            if beta <= alpha:
+                self.transposition_table.cutoffs += 1
+                return score, stored_move
+
+        best_move  = (None, None)
+        best_score = float('-inf') if is_maximizing else float('inf')
+        player     =             2 if is_maximizing else 1
+        
+        # Try all possible moves, most promising first (see order_moves). Near the
+        # root, boards are often symmetric, and then moves that mirror each other
+        # lead to the same position. Only the first of those is searched.
+        moves = self.order_moves(board, depth, player, tt_move)
+        if depth < self.symmetry_plies:
+            moves = self.unique_moves(board, moves)
+        for index, (cell, source) in enumerate(moves):
+
+            # Base cases: game over scenarios, scored at the depth of the finished board
+            if board.make_move(cell, player):
+                score = self.win_score - (depth + 1) if is_maximizing else -self.win_score + (depth + 1)   # AI is maximizer
+            elif board.is_full():
+                score = 0                                                       # Draw
+            elif depth == 0:
+                # At the root, search one below alpha, so a move that ties the best
+                # so far gets its exact score. Ties go to the move first in
+                # centre_order, not the first one tried, so the pick doesn't
+                # depend on the move ordering (or on split_root's worker order).
+                score, _, = self.minimax(board, depth + 1, not is_maximizing, alpha - 1, beta)
+            else:
+                score, _, = self.minimax(board, depth + 1, not is_maximizing, alpha, beta)
+            board.undo_move(cell, player)
+
+            if is_maximizing and (score > best_score or depth == 0 and score == best_score
+                                  and self.centre_rank[cell] < self.centre_rank[best_move[0] * self.grid_size + best_move[1]]):
+                    best_score = score
+                    alpha = max(score, alpha)
+                    best_move = divmod(cell, self.grid_size)
+            elif not is_maximizing and score < best_score:
+                    best_score = score
+                    beta = min(score, beta)
+                    best_move = divmod(cell, self.grid_size)
+
+            if beta <= alpha:
+                self.pruning_counter += 1
+                self.search_stats.record_cutoff(source, first=index == 0)
+                # Remember the move that refuted this position for the ordering of its siblings
+                killers = self.killers[depth]
+                if source != MoveOrdering.TT_MOVE and killers[0] != cell:
+                    killers[0], killers[1] = cell, killers[0]
+                self.history[player - 1][cell] += remaining * remaining
+                break
+
+        if best_score <= alpha_start:
+            bound = Bound.UPPER
+        elif best_score >= beta_start:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        stored = (best_score + depth if best_score > self.max_eval else
+                  best_score - depth if best_score < -self.max_eval else best_score)
+        self.transposition_table.store(key, remaining, stored, bound, board.to_canonical(best_move, symmetry))
+
+        return best_score, best_move
+
+
+# Where root-split search workers come from. Pools are made while the app is
+# running threads, and forking a threaded process can hand the child a lock that
+# is held forever, so the workers start from a fresh process instead.
+SEARCH_CONTEXT = get_context("forkserver" if "forkserver" in get_all_start_methods() else "spawn")
+
+# Per-process state of the root-split search workers, set up by _init_search_worker.
+_search_worker: dict = {}
+
+def _init_search_worker(grid_size: int, move_ordering: MoveOrdering, zobrist_keys: list[tuple[int, int]],
+                        shared_alpha, stop):
+    """Pool initializer: every worker keeps its own MinimaxSearch (and so its own
+    transposition table and history) for the whole game. It shares the stop
+    event of the MinimaxSearch that owns the pool."""
+    _search_worker["search"] = MinimaxSearch(grid_size, move_ordering=move_ordering, zobrist_keys=zobrist_keys)
+    _search_worker["search"].stop = stop
+    _search_worker["alpha"] = shared_alpha
+    _search_worker["turn"] = 0
+
+def _search_root_move(
+    pieces: tuple[int, int],
+    cell: int,
+    max_depth: int,
+    turn: int,
+    deadline: float | None
+) -> tuple[int | None, int, int, int]:
+    """Pool task: score one root move. Returns the score (None if time ran out)
+    and the node, pruning and depth limit counts."""
+    search: MinimaxSearch = _search_worker["search"]
+    shared_alpha = _search_worker["alpha"]
+    if turn != _search_worker["turn"]:
+        search.new_search()
+        _search_worker["turn"] = turn
+    search.max_depth = max_depth
+    search.deadline = None if deadline is None else perf_counter() + deadline - time()
+    search.minimax_counter = search.pruning_counter = search.depth_limit_counter = 0
+    board = BitBoard.from_pieces(search.grid_size, pieces, search.zobrist_keys)
+    try:
+        # One below the best score so far, so a move that ties it still gets its exact score
+        score = search.search_root_move(board, cell, shared_alpha.value - 1)
+    except SearchTimeout:
+        return None, search.minimax_counter, search.pruning_counter, search.depth_limit_counter
+    with shared_alpha.get_lock():
+        if score > shared_alpha.value:
+            shared_alpha.value = score
+    return score, search.minimax_counter, search.pruning_counter, search.depth_limit_counter
+
+
+class SolvedPositions:
+    """Perfect play for small boards, worked out ahead of time by solve(). \n
+    A board's number is its base 3 value (cell k adds 3**k times the player
+    on it). Only boards the AI has to move on are stored, and only the
+    smallest of the numbers of their 8 symmetric copies, with the best move
+    for the AI on that copy. The file is memory-mapped, so a lookup is a
+    binary search that only loads the pages it touches. \n
+    File layout: a 4 byte header (b"TTT" and the grid size), the sorted board
+    numbers as 4 byte unsigned ints, then one byte per board in the same order:
+    cell + 1 in the low 5 bits, and the outcome for the AI with perfect play
+    in the next 2 (DRAW, WIN or LOSS)."""
+
+    DRAW, WIN, LOSS = 0, 1, 2
+    SIZES = range(2, 5)     # 5x5 has 3**25 numbers, too many to solve or fit in 4 bytes
+    MAGIC = b"TTT"
+
+    def __init__(self, path: Path, size: int):
+        self.size = size
+        with open(path, "rb") as file:
+            count, extra = divmod(os.fstat(file.fileno()).st_size - 4, 5)
+            if count < 0 or extra or file.read(4) != self.MAGIC + bytes([size]):
+                raise ValueError(f"{path} is not a solved positions table for {size}x{size}")
+            # The map keeps its own handle on the file
+            self.table = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self.table)
+        self.numbers = view[4:4 + 4 * count].cast("I")
+        self.entries = view[4 + 4 * count:]
+        view.release()
+
+    @staticmethod
+    def path(size: int) -> Path:
+        return Path(__file__).resolve().with_name(f"tictactoe_{size}x{size}.solved")
+
+    @classmethod
+    def load(cls, size: int) -> SolvedPositions | None:
+        """Returns the table for this grid size, or None if it hasn't been built."""
+        path = cls.path(size)
+        return cls(path, size) if path.exists() else None
+
+    def close(self):
+        # The views have to go before the map can be closed
+        self.numbers.release()
+        self.entries.release()
+        self.table.close()
+
+    @staticmethod
+    def weights(size: int) -> list[list[int]]:
+        """weights[k][cell]: what a player 1 piece on cell adds to the base 3 number
+        of the board's copy under symmetry k. Player 2 pieces add twice as much."""
+        return [[3 ** image for image in permutation] for permutation in (SYMMETRIES.get(size) or symmetries(size))]
+
+    def best_move(self, board: BitBoard) -> tuple[int, int] | None:
+        """The AI's best move on this board, or None if it isn't in the table."""
+
+        weights = self.weights(self.size)
+        numbers = [0] * 8
+        for player in (1, 2):
+            remaining = board.pieces[player - 1]
+            while remaining:
+                move = remaining & -remaining
+                remaining ^= move
+                cell = move.bit_length() - 1
+                for k in range(8):
+                    numbers[k] += player * weights[k][cell]
+        number = min(numbers)
+        index = bisect_left(self.numbers, number)
+        if index == len(self.numbers) or self.numbers[index] != number:
+            return None
+        entry = self.entries[index]
+        symmetry = numbers.index(number)
+        return divmod(board.inverses[symmetry][(entry & 31) - 1], self.size)
+
+    @classmethod
+    def solve(cls, size: int) -> bytes:
+        """Solve every board that can come up with the human moving first, and
+        return the table file's contents. Each distinct position (up to symmetry)
+        is solved once: values go in a memo at the position's smallest base 3
+        number, as the player to move's score: win_score - moves to the end for
+        a win, the negative of that for a loss, 0 for a draw. Scores fit in a
+        byte offset by 128."""
+
+        if size not in cls.SIZES:
+            raise ValueError(f"Can only solve grid sizes {cls.SIZES.start} to {cls.SIZES.stop - 1}, not {size}")
+        sys.setrecursionlimit(max(sys.getrecursionlimit(), 100 + size * size))
+        board = BitBoard(size, [(0, 0)] * (size * size))
+        weights = cls.weights(size)
+        win_score = size * size + 1
+        memo = bytearray(3 ** (size * size))
+        solved_numbers, solved_entries = array("I"), bytearray()
+        lines = WIN_MASKS.get(size) or winning_lines(size)
+        order = sorted(range(size * size), key=lambda cell: -sum(line >> cell & 1 for line in lines))
+        numbers = [0] * 8
+
+        def value(player: int) -> int:
+            number = min(numbers)
+            if memo[number]:
+                return memo[number] - 128
+            best_score, best_cell = -win_score, None
+            empty = board.empty_cells()
+            for cell in order:
+                if not empty >> cell & 1:
+                    continue
+                if board.make_move(cell, player):
+                    score = win_score - 1
+                elif board.is_full():
+                    score = 0
+                else:
+                    for k in range(8):
+                        numbers[k] += player * weights[k][cell]
+                    reply = value(3 - player)
+                    for k in range(8):
+                        numbers[k] -= player * weights[k][cell]
+                    # One move further from the end than the reply's score
+                    score = -reply + 1 if reply > 0 else -reply - 1 if reply < 0 else 0
+                board.undo_move(cell, player)
+                if best_cell is None or score > best_score:
+                    best_score, best_cell = score, cell
+            memo[number] = best_score + 128
+            if player == 2:
+                symmetry = numbers.index(number)
+                outcome = cls.WIN if best_score > 0 else cls.LOSS if best_score < 0 else cls.DRAW
+                solved_numbers.append(number)
+                solved_entries.append(board.symmetries[symmetry][best_cell] + 1 | outcome << 5)
+            return best_score
+
+        value(1)
+        # Put the entries in number order (they are never 0) by spreading them
+        # over a fresh table the size of the memo, which it replaces, rather
+        # than sorting a list of Python ints.
+        memo = None
+        spread = bytearray(3 ** (size * size))
+        for number, entry in zip(solved_numbers, solved_entries):
+            spread[number] = entry
+        solved = array("I", (match.start() for match in re.finditer(b"[^\0]", spread)))
+        return cls.MAGIC + bytes([size]) + solved.tobytes() + bytes(spread[number] for number in solved)
+
+    @classmethod
+    def build(cls, size: int):
+        """Solve a grid size and write its table next to this script."""
+        cls.path(size).write_bytes(cls.solve(size))
+
+
 class SpinnerWidget(Static):
     def __init__(self, spinner, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -225,10 +1138,28 @@ class GameManager(Widget):
             self.row = row
             self.col = col
 
-    def __init__(self, *args, **kwargs):
+    def __init__(
+        self,
+        *args,
+        time_budget_ms: int = 1000,
+        move_ordering: MoveOrdering = MoveOrdering.ALL,
+        search_workers: int = 1,
+        **kwargs
+    ):
+        """ | Arg            | Description
+            |----------------|-------------
+            | time_budget_ms | - How long the AI may think about each move, in milliseconds
+            | move_ordering  | - Which MoveOrdering heuristics the minimax uses
+            | search_workers | - Processes to split the AI's search over """
+
         super().__init__(*args, **kwargs)
         self.display = False
         self.game_running = False
+        self.time_budget_ms = time_budget_ms
+        self.move_ordering = move_ordering
+        self.search_workers = search_workers
+        self.search = None
+        self.solved_positions = None
     
     #* Called by: `mount_grid` and `restart` in main App.
     def start_game(self, grid_size: int):
@@ -237,6 +1168,12 @@ class GameManager(Widget):
         self.grid_size = grid_size
         self.int_board = [[0 for _ in range(self.grid_size)] for _ in range(self.grid_size)]
         self.move_counter = 0
+        if self.search is not None:
+            self.search.close()
+        self.search = MinimaxSearch(self.grid_size, self.time_budget_ms, self.move_ordering, self.search_workers)
+        if self.solved_positions is not None:
+            self.solved_positions.close()
+        self.solved_positions = SolvedPositions.load(self.grid_size)     # None if not built for this size
 
         self.post_message(self.ChangeTurn(PlayerState.PLAYER1))
         self.notify("Game started", timeout=1.5)
@@ -269,21 +1206,29 @@ class GameManager(Widget):
     #* Called by: change_turn in main App.
     async def computer_turn_orch(self):
 
-        self.minimax_counter = 0
-        self.pruning_counter = 0
-        self.depth_limit_counter = 0
-
-        board_copy = deepcopy(self.int_board)
-        worker = self.computer_turn_worker(board_copy)
-        ai_row, ai_col = await worker.wait()
-        if ai_row is None:
-            raise ValueError("AI made an invalid move.")
-
-        self.log(
-            f"Minimax counter: {self.minimax_counter}\n"
-            f"Branches pruned: {self.pruning_counter}\n"
-            f"Times depth limit reached: {self.depth_limit_counter}\n"
-        )        
+        search = self.search
+        board = BitBoard.from_int_board(self.int_board, search.zobrist_keys)
+        solved_move = self.solved_positions.best_move(board) if self.solved_positions is not None else None
+        if solved_move is not None:
+            ai_row, ai_col = solved_move
+            self.log(f"Move from the solved positions table: {solved_move}\n")
+        else:
+            worker = self.computer_turn_worker(board)
+            ai_row, ai_col = await worker.wait()
+            if self.search is not search:
+                return          # The game was restarted while the AI was thinking
+            if ai_row is None:
+                raise ValueError("AI made an invalid move.")
+
+            self.log(
+                f"Minimax counter: {search.minimax_counter}\n"
+                f"Branches pruned: {search.pruning_counter}\n"
+                f"Times depth limit reached: {search.depth_limit_counter}\n"
+                f"Deepest completed search: {search.completed_depth}\n"
+                f"{search.search_stats}\n"
+                f"Transposition table hits: {search.transposition_table.hits}\n"
+                f"Transposition table cutoffs: {search.transposition_table.cutoffs}\n"
+            )
 
         self.int_board[ai_row][ai_col] = 2              # Apply AI move to integer board
         self.move_counter += 1
@@ -297,17 +1242,9 @@ class GameManager(Widget):
         self.post_message(self.ChangeTurn(PlayerState.PLAYER1))     # Change turn back to human
 
     @work(thread=True)
-    async def computer_turn_worker(self, board: list[list[int]]) -> tuple[int, int]:
-
-        await sleep(0.5)            # Artificial delay to simulate thinking time
-        _, best_move = self.minimax(
-            board,
-            depth=0,
-            alpha = float('-inf'),
-            beta = float('inf'), 
-            is_maximizing=True           # AI is maximizer
-        ) 
-        return best_move
+    def computer_turn_worker(self, board: BitBoard) -> tuple[int, int]:
+
+        return self.search.choose_move(board)
 
     #* Called by: cell_pressed in this class.
     def calculate_winner(self, board: list[list[int]]) -> PlayerState | None:
@@ -333,74 +1270,6 @@ class GameManager(Widget):
         
         return None
 
-
-    def minimax(
-        self,
-        board: list[list[int]],
-        depth: int,
-        is_maximizing: bool,
-        alpha: float,
-        beta: float
-    ) -> tuple[int, tuple[int, int]]:       # score, best_move coordinates
-        """ | Arg           | Description 
-            |---------------|---------------------
-            | board         | - The current game board state
-            | depth         | - Current depth in the game tree
-            | is_maximizing | - True if AI's turn (maximizing), False if human's turn (minimizing)
-
-            Returns:
-                tuple[int, tuple[int, int]]: best_score, (best_move coordinates)"""
-
-        self.minimax_counter += 1
-
-        result = self.calculate_winner(board)
-
-        # Base cases: game over scenarios
-        if result == PlayerState.PLAYER2:       # AI is maximizer
-            return 10 - depth, None
-        elif result == PlayerState.PLAYER1:     # Human is minimizer
-            return -10 + depth, None
-        elif result == PlayerState.EMPTY:       # Draw
-            return 0, None
-        
-        if self.grid_size <= 3:
-            max_depth = 9
-        if self.grid_size == 4:             
-            max_depth = self.move_counter if self.move_counter < 5 else 5   # Starts at 1, increases to 5.
-        if self.grid_size == 5:                                             # Makes it play fast without thinking much.
-            max_depth = self.move_counter if self.move_counter < 3 else 3   # for 5x5 its capped at 3.
-
-        if depth == max_depth:
-            self.depth_limit_counter += 1
-            return 0, None
-    
-        best_move  = (None, None)
-        best_score = float('-inf') if is_maximizing else float('inf')
-        player     =             2 if is_maximizing else 1
-        
-        # Try all possible moves
-        for row, col in product(range(self.grid_size), range(self.grid_size)):
-            if board[row][col] == 0:        # only empty cells
-
-                board[row][col] = player
-                score, _, = self.minimax(board, depth + 1, not is_maximizing, alpha, beta)
-                board[row][col] = 0         # Undo move
-
-                if is_maximizing and score > best_score:
-                        best_score = score
-                        alpha = max(score, alpha)
-                        best_move = (row, col)
-                elif not is_maximizing and score < best_score:
-                        best_score = score
-                        beta = min(score, beta)
-                        best_move = (row, col)
-
-                if beta <= alpha:
-                    self.pruning_counter += 1
-                    break
-
-        return best_score, best_move
-
     @on(Worker.StateChanged)
     def worker_state_changed(self, event: Worker.StateChanged) -> None:
         if event.state == WorkerState.SUCCESS:
@@ -415,8 +1284,8 @@ class MyScreen(ModalScreen):
         with Container(classes="auto bordered"):
             yield Label("Enter a number between 2 and 5: \n")
             yield Input(id="input", type="integer", validators=[Number(2, 5)], validate_on=["submitted"])
-            yield Label("\nNote: AI won't play strategically \nfor grid sizes larger than 3. But it \n"
-                        "should still block you from winning.")
+            yield Label("\nNote: AI can't look to the end of the \ngame for grid sizes larger than 3, so \n"
+                        "it judges positions by their open lines.")
 
     @on(Input.Submitted)
     def close(self, event: Input.Submitted):
@@ -465,9 +1334,21 @@ class TicTacToe(App):
         Binding("right", "focus_next", "Move right"),
     ]    
 
+    def __init__(self, *args, time_budget_ms: int = 1000, search_workers: int = 1, **kwargs):
+        """ | Arg            | Description
+            |----------------|-------------
+            | time_budget_ms | - How long the AI may think about each move, in milliseconds
+            | search_workers | - Processes to split the AI's search over """
+
+        super().__init__(*args, **kwargs)
+        self.time_budget_ms = time_budget_ms
+        self.search_workers = search_workers
+        if search_workers > 1:
+            MinimaxSearch.start_helpers()
+
     def compose(self):
 
-        self.game_manager = GameManager()
+        self.game_manager = GameManager(time_budget_ms=self.time_budget_ms, search_workers=self.search_workers)
         yield self.game_manager
 
         with Horizontal(classes="bar header"):
@@ -550,4 +1431,17 @@ class TicTacToe(App):
 
 
 if __name__ == "__main__":
-    TicTacToe().run()
\ No newline at end of file
+    parser = ArgumentParser(description="Tic-Tac-Toe against a minimax AI.")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes to split the AI's search over (default: 1, no pool)")
+    parser.add_argument("--time-budget", type=int, default=1000, metavar="MS",
+                        help="How long the AI may think about each move, in milliseconds (default: 1000)")
+    # `--solve 3` builds the solved positions table for 3x3 (tictactoe_3x3.solved,
+    # next to this script). The game uses it when it's there.
+    parser.add_argument("--solve", type=int, metavar="SIZE", choices=SolvedPositions.SIZES,
+                        help="Build the solved positions table for a grid size instead of playing")
+    args = parser.parse_args()
+    if args.solve is not None:
+        SolvedPositions.build(args.solve)
+    else:
+        TicTacToe(time_budget_ms=args.time_budget, search_workers=args.workers).run()
\ No newline at end of file